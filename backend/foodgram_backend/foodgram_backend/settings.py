@@ -56,6 +56,7 @@ LOGGING = {
 INSTALLED_APPS = [
     'recipes.apps.RecipesConfig',
     'users.apps.UsersConfig',
+    'tasks.apps.TasksConfig',
     'django.contrib.admin',
     'django.contrib.auth',
     'django.contrib.contenttypes',
@@ -69,6 +70,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'recipes.middleware.InstrumentationMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -77,7 +79,6 @@ MIDDLEWARE = [
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     # 'django.middleware.locale.LocaleMiddleware',
-    'recipes.middleware.RequestLoggingMiddleware',
 ]
 
 ROOT_URLCONF = 'foodgram_backend.urls'
@@ -121,6 +122,19 @@ DATABASES = {
 # }
 
 
+# The cache must be shared by the web and the run_worker processes
+# (memcached in docker-compose), so that invalidation reaches every process.
+# The local memory default only suits a single process in development.
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.getenv('CACHE_LOCATION', ''),
+    }
+}
+
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -161,7 +175,13 @@ REST_FRAMEWORK = {
         'rest_framework.authentication.TokenAuthentication',
     ],
 
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.LimitOffsetPagination',
+    'DEFAULT_PARSER_CLASSES': [
+        'recipes.parsers.LimitedJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
+
+    'DEFAULT_PAGINATION_CLASS': 'recipes.pagination.PageLimitPagination',
     'PAGE_SIZE': 6,
 }
 
@@ -201,5 +221,94 @@ DISPLAY_TEXT_MAX_LENGTH = 50
 MAX_PORTIONS = 20
 MAX_INGREDIENTS_AMOUNT = 2000
 MAX_COOKING_TIME = 3 * 24 * 60
+# Tags are stored as bits of Recipe.tags_mask, a signed 64-bit integer.
+MAX_TAGS = 63
+
+MAX_PAGE_SIZE = 100
+# Seconds to keep a cached list count; writes reset it earlier.
+PAGINATION_COUNT_CACHE_TIMEOUT = 60
+# Unfiltered lists of larger tables use the planner's row estimate.
+PAGINATION_APPROXIMATE_COUNT_THRESHOLD = 100000
+
+RECIPE_CACHE_TIMEOUT = 60 * 60
+
+# Minimal trigram similarity and result count of fuzzy ingredient search.
+INGREDIENT_FUZZY_THRESHOLD = 0.3
+INGREDIENT_FUZZY_LIMIT = 20
+# Rows inserted per bulk_create when importing ingredients.
+INGREDIENT_IMPORT_CHUNK_SIZE = 1000
+
+# Number of rows Recipe.favorites_count increments are spread over,
+# 0 updates the recipe row directly.
+FAVORITES_COUNTER_SHARDS = int(os.getenv('FAVORITES_COUNTER_SHARDS', 0))
+
+# Rows fetched per round trip while streaming a shopping list.
+SHOPPING_LIST_CHUNK_SIZE = 2000
+# Rendered shopping lists up to this size are cached per cart version.
+SHOPPING_LIST_CACHE_MAX_SIZE = 512 * 1024
+SHOPPING_LIST_CACHE_TIMEOUT = 60 * 60
+
+# Recipe image renditions: name -> (width, height, crop to the size).
+IMAGE_RENDITIONS = {
+    'thumb': (160, 160, True),
+    'card': (480, 320, True),
+    'full': (1280, 1280, False),
+}
+IMAGE_RENDITION_QUALITY = {'webp': 80, 'jpeg': 85}
+# Seconds a released image is kept after its last upload, since a recipe
+# being saved may reuse it; collect_images deletes it later.
+IMAGE_RELEASE_GRACE_PERIOD = 10 * 60
+# Limits of uploaded recipe images, checked before the image is decoded.
+IMAGE_MAX_UPLOAD_SIZE = int(
+    os.getenv('IMAGE_MAX_UPLOAD_SIZE', 10 * 1024 * 1024)
+)
+IMAGE_MAX_DIMENSION = 8000
+IMAGE_MAX_PIXELS = 40 * 1000 * 1000
+# Uploaded files are streamed to temporary files instead of memory.
+FILE_UPLOAD_HANDLERS = ['recipes.parsers.LimitedTemporaryFileUploadHandler']
+# Limit of the JSON bodies, checked by recipes.parsers.LimitedJSONParser,
+# and of the form fields of multipart requests: a base64 image
+# and the rest of a recipe.
+DATA_UPLOAD_MAX_MEMORY_SIZE = IMAGE_MAX_UPLOAD_SIZE * 4 // 3 + 1024 * 1024
+
+# Send the Server-Timing header to every client, not only to staff users.
+SERVER_TIMING_PUBLIC = os.getenv('SERVER_TIMING_PUBLIC', 'False') == 'True'
+# Share of the requests that are not slow logged with their timings.
+REQUEST_LOG_SAMPLE_RATE = float(os.getenv('REQUEST_LOG_SAMPLE_RATE', 0.01))
+# Seconds after which a request is logged as slow,
+# per view name for the views that are expected to take longer.
+SLOW_REQUEST_THRESHOLD = float(os.getenv('SLOW_REQUEST_THRESHOLD', 0.5))
+SLOW_REQUEST_THRESHOLDS = {
+    'recipes-download-shopping-cart': 2.0,
+    'import-ingredients': 10.0,
+}
+
+# Background tasks run by the run_worker command.
+# Run tasks inline when they are enqueued, for development without a worker.
+TASKS_EAGER = os.getenv('TASKS_EAGER', 'False') == 'True'
+TASKS_CONCURRENCY = int(os.getenv('TASKS_CONCURRENCY', 2))
+# Seconds an idle worker thread waits before polling the queue again.
+TASKS_POLL_INTERVAL = 1
+# Seconds between requeueing stale tasks and scheduling periodic ones.
+TASKS_HOUSEKEEPING_INTERVAL = 60
+TASKS_MAX_ATTEMPTS = 5
+# Retry delays double from TASKS_RETRY_DELAY up to TASKS_MAX_RETRY_DELAY.
+TASKS_RETRY_DELAY = 10
+TASKS_MAX_RETRY_DELAY = 60 * 60
+# Running tasks not finished in this time are considered lost.
+TASKS_LOCK_TIMEOUT = 60 * 60
+# Finished tasks are kept for this time.
+TASKS_KEEP_DONE = 7 * 24 * 60 * 60
+# Task name -> seconds between runs.
+TASKS_PERIODIC = {
+    'recipes.tasks.reconcile_counters': 24 * 60 * 60,
+    'recipes.tasks.collect_images': 24 * 60 * 60,
+    'tasks.tasks.prune_tasks': 24 * 60 * 60,
+}
+
+# TrueType font with Cyrillic glyphs for the PDF shopping list.
+PDF_FONT_PATH = os.getenv(
+    'PDF_FONT_PATH', '/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf'
+)
 
 PASSWORD_MAX_LENGTH = 50
@@ -114,4 +114,106 @@ TRANSLATE = {
     'Shopping Carts': {
         'ru': 'Списки покупок'
     },
+    'update date': {
+        'ru': 'дата изменения'
+    },
+    'version': {
+        'ru': 'версия'
+    },
+    'table version': {
+        'ru': 'версия таблицы'
+    },
+    'Table Versions': {
+        'ru': 'Версии таблиц'
+    },
+    'bit': {
+        'ru': 'бит'
+    },
+    'tags mask': {
+        'ru': 'маска тегов'
+    },
+    'recipes count': {
+        'ru': 'количество рецептов'
+    },
+    'followers count': {
+        'ru': 'количество подписчиков'
+    },
+    'favorites count': {
+        'ru': 'количество добавлений в избранное'
+    },
+    'shard': {
+        'ru': 'сегмент'
+    },
+    'count': {
+        'ru': 'количество'
+    },
+    'favorites counter shard': {
+        'ru': 'сегмент счётчика избранного'
+    },
+    'Favorites Counter Shards': {
+        'ru': 'Сегменты счётчиков избранного'
+    },
+    'Shopping list': {
+        'ru': 'Список покупок'
+    },
+    'shopping list item': {
+        'ru': 'позиция списка покупок'
+    },
+    'Shopping List Items': {
+        'ru': 'Позиции списков покупок'
+    },
+    'Tasks': {
+        'ru': 'Задачи'
+    },
+    'task': {
+        'ru': 'задача'
+    },
+    'arguments': {
+        'ru': 'аргументы'
+    },
+    'keyword arguments': {
+        'ru': 'именованные аргументы'
+    },
+    'key': {
+        'ru': 'ключ'
+    },
+    'status': {
+        'ru': 'статус'
+    },
+    'queued': {
+        'ru': 'в очереди'
+    },
+    'running': {
+        'ru': 'выполняется'
+    },
+    'done': {
+        'ru': 'выполнена'
+    },
+    'failed': {
+        'ru': 'ошибка'
+    },
+    'run at': {
+        'ru': 'время запуска'
+    },
+    'attempts': {
+        'ru': 'попытки'
+    },
+    'max attempts': {
+        'ru': 'максимум попыток'
+    },
+    'last error': {
+        'ru': 'последняя ошибка'
+    },
+    'worker': {
+        'ru': 'обработчик'
+    },
+    'locked at': {
+        'ru': 'время захвата'
+    },
+    'created at': {
+        'ru': 'время создания'
+    },
+    'finished at': {
+        'ru': 'время завершения'
+    },
 }
@@ -1,7 +1,9 @@
 from django.contrib import admin
+from tasks.queue import enqueue
 
 from recipes.models import (Favorites, Ingredient, MeasurementUnit, Recipe,
                             ShoppingCart, Tag)
+from recipes.tasks import rebuild_shopping_lists
 
 
 class CustomShoppingCart(admin.ModelAdmin):
@@ -31,6 +33,18 @@ class RecipeAdmin(admin.ModelAdmin):
 
     inlines = (IngredientInline, TagInline)
 
+    def save_related(self, request, form, formsets, change):
+        """
+        Inline ingredient rows are saved one by one, so the shopping lists
+        with the recipe are rebuilt once afterwards, in the background.
+        """
+        super().save_related(request, form, formsets, change)
+        user_ids = list(ShoppingCart.objects.filter(
+            recipe=form.instance
+        ).values_list('user_id', flat=True))
+        if user_ids:
+            enqueue(rebuild_shopping_lists, user_ids)
+
     def ingredients_list(self, obj):
         return ", ".join(
             [ingredient.name for ingredient in obj.ingredients.all()]
@@ -0,0 +1,104 @@
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Prefetch
+from foodgram_backend.settings import RECIPE_CACHE_TIMEOUT
+
+from recipes.models import RecipeIngredient
+
+RECIPE_CACHE_VERSION_KEY = 'recipe_fragment_version'
+RECIPE_CACHE_KEY = 'recipe_fragment:{version}:{recipe_id}'
+
+
+def get_cache_version(key):
+    """
+    Return the version counter stored in the cache under the key.
+    A missing counter starts from the current time in nanoseconds,
+    so it never repeats a value an evicted counter has had.
+    """
+    return cache.get_or_set(key, time.time_ns, None)
+
+
+def bump_cache_version(key):
+    """
+    Increment the version counter, which invalidates every entry
+    keyed by its previous value.
+    """
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), None)
+
+
+def get_recipe_prefetches():
+    """
+    Lookups needed to render the user-independent part of a recipe.
+    """
+    return (
+        'tags',
+        Prefetch(
+            'recipe_ingredients',
+            queryset=RecipeIngredient.objects.select_related(
+                'ingredient__measurement_unit'
+            ).order_by('ingredient__name')
+        ),
+    )
+
+
+def get_recipe_cache_keys(recipe_ids):
+    """
+    Return a dict {cache key: recipe id} for the given recipes.
+    """
+    version = get_cache_version(RECIPE_CACHE_VERSION_KEY)
+    return {
+        RECIPE_CACHE_KEY.format(version=version, recipe_id=recipe_id):
+            recipe_id
+        for recipe_id in recipe_ids
+    }
+
+
+def get_recipe_fragments(recipe_ids):
+    """
+    Return a dict {recipe id: cached fragment} for the cached recipes.
+    """
+    keys = get_recipe_cache_keys(recipe_ids)
+    return {
+        keys[key]: fragment
+        for key, fragment in cache.get_many(list(keys)).items()
+    }
+
+
+def set_recipe_fragments(fragments):
+    """
+    Store a dict {recipe id: fragment} in the cache.
+    """
+    keys = get_recipe_cache_keys(fragments)
+    cache.set_many(
+        {key: fragments[recipe_id] for key, recipe_id in keys.items()},
+        RECIPE_CACHE_TIMEOUT
+    )
+
+
+def invalidate_recipes(recipe_ids):
+    """
+    Drop the cached fragments of the recipes once the current transaction
+    commits. Dropped earlier, a concurrent request could cache
+    the uncommitted, old rows again.
+    """
+    recipe_ids = list(recipe_ids)
+    transaction.on_commit(
+        lambda: cache.delete_many(list(get_recipe_cache_keys(recipe_ids)))
+    )
+
+
+def invalidate_all_recipes():
+    """
+    Drop every cached fragment, e.g. when a tag or an ingredient changes,
+    once the current transaction commits.
+    """
+    transaction.on_commit(drop_all_recipes)
+
+
+def drop_all_recipes():
+    bump_cache_version(RECIPE_CACHE_VERSION_KEY)
@@ -0,0 +1,24 @@
+from django.conf import settings
+from django.core.checks import Tags, Warning, register
+
+LOCAL_CACHE_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+@register(Tags.caches, deploy=True)
+def check_shared_cache(app_configs, **kwargs):
+    """
+    Cache versions invalidate the recipe fragments, list counts, search
+    indexes and shopping lists of every process, the run_worker one
+    included, only through a cache they all share.
+    """
+    if settings.CACHES['default']['BACKEND'] in LOCAL_CACHE_BACKENDS:
+        return [Warning(
+            'The default cache is local to the process.',
+            hint='Set CACHE_BACKEND and CACHE_LOCATION to a shared cache, '
+                 'e.g. memcached.',
+            id='recipes.W001',
+        )]
+    return []
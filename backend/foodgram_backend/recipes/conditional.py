@@ -0,0 +1,167 @@
+from functools import wraps
+from hashlib import md5
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+
+from recipes.models import Recipe, TableVersion
+
+RECIPES_VERSION = 'recipes'
+TAGS_VERSION = 'tags'
+INGREDIENTS_VERSION = 'ingredients'
+# Favorites and followers counters shown in recipes.
+COUNTERS_VERSION = 'counters'
+USER_VERSION = 'user:{user_id}'
+
+
+def bump_version(name):
+    """
+    Increment the version counter with the given name.
+    """
+    updated = TableVersion.objects.filter(name=name).update(
+        version=F('version') + 1, updated_at=timezone.now()
+    )
+    if not updated:
+        TableVersion.objects.get_or_create(name=name, defaults={'version': 1})
+
+
+def bump_version_on_commit(name):
+    """
+    Increment the version counter once the current transaction commits,
+    so writes do not hold the counter row locked until then and do not
+    queue up behind each other on it. A transaction bumps each counter
+    once, however many rows it changes.
+    """
+    connection = transaction.get_connection()
+    if any(
+        getattr(func, 'pending_version', None) == name
+        for _, func in connection.run_on_commit
+    ):
+        return
+
+    def bump():
+        bump.pending_version = None
+        bump_version(name)
+
+    bump.pending_version = name
+    transaction.on_commit(bump)
+
+
+def bump_user_version(user_id):
+    bump_version_on_commit(USER_VERSION.format(user_id=user_id))
+
+
+def touch_recipes(recipe_ids):
+    """
+    Mark recipes as modified after a change of their related rows.
+    """
+    Recipe.objects.filter(id__in=recipe_ids).update(
+        updated_at=timezone.now()
+    )
+    bump_version_on_commit(RECIPES_VERSION)
+
+
+def get_validators(request, names, extra=None):
+    """
+    Return the ETag and the last modification timestamp of a response
+    built from the given version counters and the current user's marks.
+    """
+    names = list(names)
+    if request.user.is_authenticated:
+        names.append(USER_VERSION.format(user_id=request.user.id))
+    versions = dict.fromkeys(names, (0, None))
+    versions.update(
+        (name, (version, updated_at))
+        for name, version, updated_at in TableVersion.objects.filter(
+            name__in=names
+        ).values_list('name', 'version', 'updated_at')
+    )
+    dates = [updated_at for _, updated_at in versions.values() if updated_at]
+    if extra is not None:
+        dates.append(extra)
+
+    etag_source = '{}:{}:{}:{}'.format(
+        request.get_full_path(),
+        request.user.id,
+        sorted(versions.items()),
+        extra.isoformat() if extra else '',
+    )
+    etag = quote_etag(md5(etag_source.encode()).hexdigest())
+    last_modified = int(max(dates).timestamp()) if dates else None
+    return etag, last_modified
+
+
+def conditional_list(*names):
+    """
+    View decorator that answers a matching conditional GET with 304
+    before the queryset is evaluated.
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            etag, last_modified = get_validators(request, names)
+            return respond_conditionally(
+                view_func, request, etag, last_modified, *args, **kwargs
+            )
+        return wrapper
+    return decorator
+
+
+def conditional_index(index):
+    """
+    Like conditional_list, but validated by the version of an in-memory
+    index, so a response served from the index needs no query.
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            index.ensure_fresh()
+            etag_source = f'{request.get_full_path()}:{index.version}'
+            etag = quote_etag(md5(etag_source.encode()).hexdigest())
+            return respond_conditionally(
+                view_func, request, etag, None, *args, **kwargs
+            )
+        return wrapper
+    return decorator
+
+
+def conditional_recipe(*names):
+    """
+    Like conditional_list, but also takes the updated_at
+    of the requested recipe into account.
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            pk = str(kwargs.get('pk'))
+            updated_at = pk.isdigit() and Recipe.objects.filter(
+                pk=pk
+            ).values_list('updated_at', flat=True).first()
+            if not updated_at:
+                return view_func(request, *args, **kwargs)
+            etag, last_modified = get_validators(
+                request, names, extra=updated_at
+            )
+            return respond_conditionally(
+                view_func, request, etag, last_modified, *args, **kwargs
+            )
+        return wrapper
+    return decorator
+
+
+def respond_conditionally(view_func, request, etag, last_modified,
+                          *args, **kwargs):
+    response = get_conditional_response(
+        request, etag=etag, last_modified=last_modified
+    )
+    if response is None:
+        response = view_func(request, *args, **kwargs)
+    if response.status_code in (200, 304):
+        response['ETag'] = etag
+        if last_modified is not None:
+            response['Last-Modified'] = http_date(last_modified)
+        patch_vary_headers(response, ('Authorization', ))
+    return response
@@ -0,0 +1,121 @@
+import random
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+from foodgram_backend.settings import FAVORITES_COUNTER_SHARDS
+from users.models import Subscription, User
+
+from recipes.conditional import COUNTERS_VERSION, bump_version_on_commit
+from recipes.models import Favorites, FavoritesCounterShard, Recipe
+
+
+def increment_counter(queryset, field, delta=1):
+    """
+    Atomically change a counter column, never below zero.
+    Returns the number of changed rows.
+    """
+    if delta < 0:
+        queryset = queryset.filter(**{f'{field}__gte': -delta})
+    return queryset.update(**{field: F(field) + delta})
+
+
+def increment_user_counter(user_id, field, delta=1):
+    increment_counter(User.objects.filter(id=user_id), field, delta)
+
+
+def increment_favorites_count(recipe_id, delta=1):
+    """
+    Change the favorites counter of a recipe, through a random shard
+    when FAVORITES_COUNTER_SHARDS is set.
+    """
+    if FAVORITES_COUNTER_SHARDS:
+        shard = random.randrange(FAVORITES_COUNTER_SHARDS)
+        shards = FavoritesCounterShard.objects.filter(recipe_id=recipe_id)
+        if delta < 0:
+            if decrement_shards(shards, shard, delta):
+                return
+        elif increment_shard(recipe_id, shards, shard, delta):
+            return
+    increment_counter(
+        Recipe.objects.filter(id=recipe_id), 'favorites_count', delta
+    )
+
+
+def increment_shard(recipe_id, shards, shard, delta):
+    shards = shards.filter(shard=shard)
+    if shards.update(count=F('count') + delta):
+        return True
+    try:
+        with transaction.atomic():
+            FavoritesCounterShard.objects.create(
+                recipe_id=recipe_id, shard=shard, count=delta
+            )
+        return True
+    except IntegrityError:
+        return bool(shards.update(count=F('count') + delta))
+
+
+def decrement_shards(shards, shard, delta):
+    """
+    Take the decrement from the random shard, or from any shard
+    holding enough when that one does not. A decrement never creates
+    a shard: the recipe itself may be being deleted.
+    """
+    if increment_counter(shards.filter(shard=shard), 'count', delta):
+        return True
+    for shard_id in shards.filter(count__gte=-delta).order_by(
+        '?'
+    ).values_list('id', flat=True):
+        if increment_counter(shards.filter(id=shard_id), 'count', delta):
+            return True
+    return False
+
+
+def annotate_favorites_count(queryset):
+    """
+    Add the sum of the counter shards as 'favorites_total'.
+    """
+    if not FAVORITES_COUNTER_SHARDS:
+        return queryset
+    shards = FavoritesCounterShard.objects.filter(
+        recipe=OuterRef('pk')
+    ).order_by().values('recipe').annotate(total=Sum('count'))
+    return queryset.annotate(
+        favorites_total=F('favorites_count') + Coalesce(
+            Subquery(shards.values('total')), 0
+        )
+    )
+
+
+def get_favorites_count(recipe):
+    return getattr(recipe, 'favorites_total', recipe.favorites_count)
+
+
+def count_subquery(queryset, field):
+    return Coalesce(Subquery(
+        queryset.filter(**{field: OuterRef('pk')}).order_by().values(
+            field
+        ).annotate(count=Count('pk')).values('count')
+    ), 0)
+
+
+@transaction.atomic
+def reconcile_counters():
+    """
+    Recompute every counter from the rows it counts and fold
+    the favorites counter shards into the recipes.
+    Returns the number of updated users and recipes.
+    """
+    users = User.objects.update(
+        recipes_count=count_subquery(Recipe.objects.all(), 'author'),
+        followers_count=count_subquery(
+            Subscription.objects.all(), 'following'
+        ),
+    )
+    recipes = Recipe.objects.update(
+        favorites_count=count_subquery(Favorites.objects.all(), 'recipe')
+    )
+    FavoritesCounterShard.objects.all().delete()
+    bump_version_on_commit(COUNTERS_VERSION)
+    return users, recipes
@@ -1,7 +1,11 @@
+from django import forms
+from django.db import connections
+from django.db.models import Exists, F, OuterRef, Subquery
 from django_filters import rest_framework as filters
 from users.models import User
 
-from recipes.models import Favorites, Recipe, ShoppingCart, Tag
+from recipes.models import Favorites, Recipe, ShoppingCart, TagBits
+from recipes.search import search_recipes, tag_index
 
 
 class StartsWithFilter(filters.CharFilter):
@@ -11,23 +15,61 @@ class StartsWithFilter(filters.CharFilter):
         return qs
 
 
+class SlugsField(forms.MultipleChoiceField):
+    """
+    Accepts any list of slugs, unknown ones are dropped by the filter.
+    """
+    def valid_value(self, value):
+        return True
+
+
+class TagsFilter(filters.MultipleChoiceFilter):
+    """
+    Recipes having any of the tags, checked against Recipe.tags_mask
+    with a single predicate instead of a join through RecipeTag.
+    On PostgreSQL the bits of the mask are matched with the GIN index.
+    """
+    field_class = SlugsField
+
+    def filter(self, qs, value):
+        if not value:
+            return qs
+        bits = tag_index.get_bits(value)
+        if not bits:
+            return qs.none()
+        if connections[qs.db].vendor == 'postgresql':
+            return qs.alias(
+                tag_bits=TagBits('tags_mask')
+            ).filter(tag_bits__overlap=bits)
+        mask = sum(1 << bit for bit in bits)
+        return qs.alias(
+            tags_match=F('tags_mask').bitand(mask)
+        ).filter(tags_match__gt=0)
+
+
 class IngredientFilterSet(filters.FilterSet):
     name = StartsWithFilter(field_name='name')
 
 
 class RecipeFilterSet(filters.FilterSet):
     author = filters.ModelChoiceFilter(queryset=User.objects.all())
-    tags = filters.ModelMultipleChoiceFilter(
-        field_name='tags__slug',
-        to_field_name='slug',
-        queryset=Tag.objects.all()
-    )
+    tags = TagsFilter()
     is_in_shopping_cart = filters.BooleanFilter(
         method='filter_is_in_shopping_cart'
     )
     is_favorited = filters.BooleanFilter(
         method='filter_is_favorited'
     )
+    search = filters.CharFilter(
+        method='filter_search'
+    )
+    ordering = filters.ChoiceFilter(
+        choices=(
+            ('favorited_at', 'favorited_at'),
+            ('-favorited_at', '-favorited_at'),
+        ),
+        method='filter_ordering'
+    )
 
     class Meta:
         model = Recipe
@@ -36,9 +78,8 @@ class RecipeFilterSet(filters.FilterSet):
     def filter_favorites_or_shopping_cart(self, queryset, name, value, model):
         if self.request.user.is_authenticated:
             if value:
-                recipes_id = model.objects.filter(
-                    user=self.request.user).values('recipe')
-                queryset = Recipe.objects.filter(id__in=recipes_id)
+                queryset = queryset.filter(Exists(model.objects.filter(
+                    user=self.request.user, recipe=OuterRef('pk'))))
         return queryset
 
     def filter_is_in_shopping_cart(self, queryset, name, value):
@@ -50,3 +91,26 @@ class RecipeFilterSet(filters.FilterSet):
         return self.filter_favorites_or_shopping_cart(
             queryset, name, value, Favorites
         )
+
+    def filter_search(self, queryset, name, value):
+        if value:
+            return search_recipes(queryset, value)
+        return queryset
+
+    def filter_ordering(self, queryset, name, value):
+        """
+        Order recipes by the time the current user added them to favorites,
+        the recipes that are not in favorites last in both directions.
+        """
+        if not self.request.user.is_authenticated:
+            return queryset
+        favorited_at = Favorites.objects.filter(
+            user=self.request.user, recipe=OuterRef('pk')
+        ).values('created_at')[:1]
+        if value.startswith('-'):
+            ordering = F('favorited_at').desc(nulls_last=True)
+        else:
+            ordering = F('favorited_at').asc(nulls_last=True)
+        return queryset.annotate(
+            favorited_at=Subquery(favorited_at)
+        ).order_by(ordering, '-pub_date')
@@ -0,0 +1,128 @@
+import io
+import os
+from datetime import timedelta
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.utils import timezone
+from foodgram_backend.settings import (IMAGE_RELEASE_GRACE_PERIOD,
+                                       IMAGE_RENDITION_QUALITY,
+                                       IMAGE_RENDITIONS)
+from PIL import Image, ImageOps
+
+from recipes.models import Recipe
+
+RENDITIONS_DIR = 'renditions'
+RENDITION_FORMATS = {'webp': 'WEBP', 'jpeg': 'JPEG'}
+
+
+def get_rendition_name(name, rendition, extension):
+    """
+    Renditions are named after the original file,
+    so their URLs are known without opening it.
+    """
+    directory, filename = os.path.split(name)
+    base = os.path.splitext(filename)[0]
+    return os.path.join(
+        directory, RENDITIONS_DIR, f'{base}_{rendition}.{extension}'
+    )
+
+
+def get_rendition_urls(image):
+    """
+    Return {rendition: {format: url}} for an image field file.
+    Until a worker has created the renditions, every URL is
+    the original image's.
+    """
+    if not image:
+        return None
+    if not has_renditions(image.name, image.storage):
+        return {
+            rendition: dict.fromkeys(RENDITION_FORMATS, image.url)
+            for rendition in IMAGE_RENDITIONS
+        }
+    return {
+        rendition: {
+            extension: image.storage.url(
+                get_rendition_name(image.name, rendition, extension)
+            )
+            for extension in RENDITION_FORMATS
+        }
+        for rendition in IMAGE_RENDITIONS
+    }
+
+
+def has_renditions(name, storage=default_storage):
+    rendition = next(iter(IMAGE_RENDITIONS))
+    extension = next(iter(RENDITION_FORMATS))
+    return storage.exists(get_rendition_name(name, rendition, extension))
+
+
+def resize(image, size, crop):
+    if crop:
+        return ImageOps.fit(image, size, Image.LANCZOS)
+    image = image.copy()
+    image.thumbnail(size, Image.LANCZOS)
+    return image
+
+
+def create_renditions(name, storage=default_storage):
+    """
+    Save every rendition of the stored image in every format.
+    EXIF orientation is applied to the pixels and metadata
+    is not copied to the renditions.
+    """
+    with storage.open(name, 'rb') as file:
+        source = Image.open(file)
+        source = ImageOps.exif_transpose(source)
+        has_alpha = source.mode in ('RGBA', 'LA') or (
+            source.mode == 'P' and 'transparency' in source.info
+        )
+        source = source.convert('RGBA' if has_alpha else 'RGB')
+
+    for rendition, (width, height, crop) in IMAGE_RENDITIONS.items():
+        image = resize(source, (width, height), crop)
+        for extension, image_format in RENDITION_FORMATS.items():
+            output = image
+            if image_format == 'JPEG' and image.mode == 'RGBA':
+                output = Image.new('RGB', image.size, (255, 255, 255))
+                output.paste(image, mask=image.getchannel('A'))
+            buffer = io.BytesIO()
+            output.save(
+                buffer, image_format,
+                quality=IMAGE_RENDITION_QUALITY[extension], optimize=True
+            )
+            rendition_name = get_rendition_name(name, rendition, extension)
+            if storage.exists(rendition_name):
+                storage.delete(rendition_name)
+            storage.save(rendition_name, ContentFile(buffer.getvalue()))
+
+
+def delete_image(name, storage=default_storage):
+    """
+    Delete a stored image with its renditions.
+    """
+    storage.delete(name)
+    for rendition in IMAGE_RENDITIONS:
+        for extension in RENDITION_FORMATS:
+            storage.delete(get_rendition_name(name, rendition, extension))
+
+
+def release_image(name, storage=default_storage):
+    """
+    Delete an image no recipe refers to any more. Recipes with
+    the same image content share one file, so the file is kept
+    while any of them refers to it, and while it has been uploaded
+    recently: a recipe with the same image may not be committed yet.
+    Such files are left to collect_images.
+    """
+    if not name or Recipe.objects.filter(image=name).exists():
+        return
+    try:
+        modified_at = storage.get_modified_time(name)
+    except FileNotFoundError:
+        return
+    grace_period = timedelta(seconds=IMAGE_RELEASE_GRACE_PERIOD)
+    if modified_at > timezone.now() - grace_period:
+        return
+    delete_image(name, storage)
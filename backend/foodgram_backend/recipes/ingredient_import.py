@@ -0,0 +1,225 @@
+import csv
+import io
+import json
+import os
+from itertools import islice
+
+from django.db import transaction
+from foodgram_backend.settings import (INGREDIENT_IMPORT_CHUNK_SIZE,
+                                       NAME_MAX_LENGTH)
+
+from recipes.conditional import INGREDIENTS_VERSION, bump_version_on_commit
+from recipes.models import Ingredient, MeasurementUnit
+from recipes.search import invalidate_ingredient_index
+
+JSON_READ_SIZE = 64 * 1024
+
+
+def read_csv_rows(file):
+    """
+    Yield (line number, row) from a 'name,measurement unit' CSV file.
+    A header row with the field names is skipped.
+    """
+    for line, row in enumerate(csv.reader(file), 1):
+        if line == 1 and [value.strip() for value in row[:2]] == [
+            'name', 'measurement_unit'
+        ]:
+            continue
+        if not row:
+            continue
+        yield line, {
+            'name': row[0],
+            'measurement_unit': row[1] if len(row) > 1 else None,
+        }
+
+
+def read_json_rows(file):
+    """
+    Yield (item number, row) from a JSON array of objects or from
+    JSON Lines, decoding one object at a time.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ''
+    number = 0
+    eof = False
+    while True:
+        buffer = buffer.lstrip(' \t\r\n,[]')
+        if not buffer:
+            if eof:
+                return
+            chunk = file.read(JSON_READ_SIZE)
+            eof = not chunk
+            buffer += chunk
+            continue
+        try:
+            item, end = decoder.raw_decode(buffer)
+        except json.JSONDecodeError:
+            chunk = '' if eof else file.read(JSON_READ_SIZE)
+            if not chunk:
+                raise ValueError(f'Invalid JSON after item {number}.')
+            buffer += chunk
+            continue
+        number += 1
+        buffer = buffer[end:]
+        yield number, item
+
+
+def read_rows(file, name):
+    """
+    Choose the reader by the extension of the file name.
+    The binary file is decoded as UTF-8 on the fly.
+    """
+    text = io.TextIOWrapper(file, encoding='utf-8-sig', newline='')
+    extension = os.path.splitext(name)[1].lower()
+    if extension in ('.json', '.jsonl', '.ndjson'):
+        return read_json_rows(text)
+    return read_csv_rows(text)
+
+
+class IngredientImporter:
+    """
+    Imports ingredients in chunks: rows are validated and de-duplicated
+    in memory, measurement units are resolved with one query per chunk
+    and new ingredients are inserted with bulk_create, skipping
+    the ones a concurrent import has inserted first.
+    bulk_create sends no signals, so the ingredient index and version
+    are invalidated explicitly at the end, also when a read error stops
+    the import after some chunks have been committed.
+    With collect_ids, self.ids lists the ingredient id of every valid row.
+    """
+
+    def __init__(self, chunk_size=INGREDIENT_IMPORT_CHUNK_SIZE,
+                 progress=None, collect_ids=False):
+        self.chunk_size = chunk_size
+        self.progress = progress
+        self.collect_ids = collect_ids
+        self.ids = []
+        # (name, measurement unit id) -> id of the rows seen so far,
+        # kept only to collect the ids.
+        self.known_ids = {}
+        self.units = {}
+        self.seen = set()
+        self.processed = 0
+        self.created = 0
+        self.existing = 0
+        self.errors = []
+
+    def run(self, rows):
+        rows = iter(rows)
+        try:
+            while True:
+                chunk = list(islice(rows, self.chunk_size))
+                if not chunk:
+                    break
+                self.import_chunk(chunk)
+                if self.progress:
+                    self.progress(self)
+        finally:
+            if self.created:
+                invalidate_ingredient_index()
+                bump_version_on_commit(INGREDIENTS_VERSION)
+        return self
+
+    def clean(self, line, row):
+        if not isinstance(row, dict):
+            self.errors.append((line, 'Row must be an object.'))
+            return None
+        name = str(row.get('name') or '').strip()
+        measurement_unit = str(row.get('measurement_unit') or '').strip()
+        if not name or not measurement_unit:
+            self.errors.append(
+                (line, 'Name and measurement unit are required.')
+            )
+            return None
+        if (len(name) > NAME_MAX_LENGTH
+                or len(measurement_unit) > NAME_MAX_LENGTH):
+            self.errors.append((line, 'Too long name.'))
+            return None
+        return name, measurement_unit
+
+    @transaction.atomic
+    def import_chunk(self, chunk):
+        items = []
+        valid = []
+        for line, row in chunk:
+            self.processed += 1
+            item = self.clean(line, row)
+            if item is None:
+                continue
+            valid.append(item)
+            if item in self.seen:
+                self.existing += 1
+                continue
+            self.seen.add(item)
+            items.append(item)
+        if items:
+            ids = self.insert(items)
+            if self.collect_ids:
+                self.known_ids.update(ids)
+        if self.collect_ids:
+            self.ids.extend(
+                self.known_ids[(name, self.units[unit].id)]
+                for name, unit in valid
+            )
+
+    def get_ids(self, keys):
+        """
+        Return {(name, measurement unit id): id} of the stored ingredients
+        among the keys.
+        """
+        return {
+            (name, unit_id): ingredient_id
+            for name, unit_id, ingredient_id in Ingredient.objects.filter(
+                name__in={name for name, _ in keys}
+            ).values_list('name', 'measurement_unit_id', 'id')
+            if (name, unit_id) in keys
+        }
+
+    def insert(self, items):
+        """
+        Insert the new ingredients and return the ids of all the items.
+        Created rows are counted from the ids read back after the insert,
+        not from the rows sent: only a row a concurrent import commits
+        between the two reads is counted as created by both imports.
+        """
+        self.resolve_units({unit for _, unit in items})
+        keys = {(name, self.units[unit].id) for name, unit in items}
+        existing = self.get_ids(keys)
+        new_keys = keys - set(existing)
+        if not new_keys:
+            self.existing += len(keys)
+            return existing
+        Ingredient.objects.bulk_create(
+            [Ingredient(name=name, measurement_unit_id=unit_id)
+             for name, unit_id in new_keys],
+            ignore_conflicts=True
+        )
+        ids = self.get_ids(keys)
+        created = len(ids) - len(existing)
+        self.created += created
+        self.existing += len(keys) - created
+        return ids
+
+    def resolve_units(self, names):
+        """
+        Load the measurement units missing from self.units,
+        creating the unknown ones.
+        """
+        names = names - set(self.units)
+        if not names:
+            return
+        units = {
+            unit.name: unit
+            for unit in MeasurementUnit.objects.filter(name__in=names)
+        }
+        missing = names - set(units)
+        if missing:
+            MeasurementUnit.objects.bulk_create(
+                [MeasurementUnit(name=name) for name in missing],
+                ignore_conflicts=True
+            )
+            units.update(
+                (unit.name, unit)
+                for unit in MeasurementUnit.objects.filter(name__in=missing)
+            )
+        self.units.update(units)
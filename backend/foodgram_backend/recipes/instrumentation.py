@@ -0,0 +1,89 @@
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from time import perf_counter
+
+current_metrics = ContextVar('current_metrics', default=None)
+
+
+class RequestMetrics:
+    """
+    Timings of a request. Also a database execute wrapper
+    counting the queries and their time.
+    """
+
+    def __init__(self):
+        self.start = perf_counter()
+        self.sql_count = 0
+        self.sql_time = 0.0
+        self.timings = defaultdict(float)
+        self.active = set()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql_time += perf_counter() - start
+            self.sql_count += 1
+
+    @contextmanager
+    def measure(self, name):
+        # Nested measures of the same name, like the items of a list
+        # serializer, are counted once.
+        if name in self.active:
+            yield
+            return
+        self.active.add(name)
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[name] += perf_counter() - start
+            self.active.discard(name)
+
+    @property
+    def duration(self):
+        return perf_counter() - self.start
+
+
+@contextmanager
+def measure(name):
+    """
+    Add the time of the block to the current request's timing 'name'.
+    """
+    metrics = current_metrics.get()
+    if metrics is None:
+        yield
+        return
+    with metrics.measure(name):
+        yield
+
+
+def measured(name):
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with measure(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class MeasuredSerializerMixin:
+    """
+    Adds the to_representation of the serializer, and of its subclasses
+    that override it, to the current request's 'serialize' timing.
+    """
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if 'to_representation' in cls.__dict__:
+            cls.to_representation = measured('serialize')(
+                cls.__dict__['to_representation']
+            )
+
+    def to_representation(self, instance):
+        with measure('serialize'):
+            return super().to_representation(instance)
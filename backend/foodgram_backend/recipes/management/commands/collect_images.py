@@ -0,0 +1,80 @@
+import os
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from foodgram_backend.settings import IMAGE_RENDITIONS
+
+from recipes.images import (RENDITION_FORMATS, RENDITIONS_DIR, delete_image,
+                            get_rendition_name)
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = (
+        'Delete recipe images and renditions no recipe refers to. '
+        'Recent files are kept, they may belong to a recipe being saved.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--min-age', type=int, default=24,
+            help='Hours since the last change of a file to delete it.'
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='List the files without deleting them.'
+        )
+
+    def handle(self, *args, **options):
+        field = Recipe._meta.get_field('image')
+        self.storage = field.storage
+        self.cutoff = timezone.now() - timedelta(hours=options['min_age'])
+        self.dry_run = options['dry_run']
+        directory = field.upload_to.rstrip('/')
+        referenced = set(
+            Recipe.objects.exclude(image='').exclude(
+                image__isnull=True
+            ).values_list('image', flat=True).distinct().iterator()
+        )
+
+        kept = set()
+        deleted = 0
+        for name in self.list_files(directory):
+            if name in referenced or not self.is_old(name):
+                kept.add(name)
+                continue
+            deleted += 1
+            self.delete(name, delete_image)
+
+        expected = {
+            get_rendition_name(name, rendition, extension)
+            for name in kept
+            for rendition in IMAGE_RENDITIONS
+            for extension in RENDITION_FORMATS
+        }
+        for name in self.list_files(os.path.join(directory, RENDITIONS_DIR)):
+            if name not in expected and self.is_old(name):
+                deleted += 1
+                self.delete(name, self.storage.delete)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{"Found" if self.dry_run else "Deleted"} '
+            f'{deleted} orphaned files.'
+        ))
+
+    def list_files(self, directory):
+        try:
+            _, files = self.storage.listdir(directory)
+        except FileNotFoundError:
+            return []
+        return [os.path.join(directory, name) for name in files]
+
+    def is_old(self, name):
+        return self.storage.get_modified_time(name) < self.cutoff
+
+    def delete(self, name, delete):
+        if self.dry_run:
+            self.stdout.write(name)
+        else:
+            delete(name)
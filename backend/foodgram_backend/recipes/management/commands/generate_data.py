@@ -0,0 +1,369 @@
+import csv
+import io
+import random
+from datetime import timedelta
+from itertools import islice
+
+from django.core.files.base import ContentFile
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connection, models, transaction
+from django.db.models import Max
+from django.utils import timezone
+from PIL import Image
+from users.models import Subscription, User
+
+from recipes.cache import invalidate_all_recipes
+from recipes.conditional import RECIPES_VERSION, bump_version
+from recipes.counters import reconcile_counters
+from recipes.images import create_renditions, has_renditions
+from recipes.models import (Favorites, Ingredient, Recipe, RecipeIngredient,
+                            RecipeTag, ShoppingCart, Tag)
+from recipes.pagination import reset_cached_counts
+from recipes.search import invalidate_recipe_index, update_search_vectors
+from recipes.shopping_list import rebuild_shopping_lists
+
+PLACEHOLDER_IMAGE = 'recipe_images/generated.png'
+PASSWORD = 'generated-password'
+DISHES = (
+    'Салат', 'Суп', 'Рагу', 'Запеканка', 'Пирог', 'Омлет', 'Паста',
+    'Каша', 'Жаркое', 'Смузи', 'Соус', 'Гратен',
+)
+WORDS = (
+    'нарезать', 'смешать', 'обжарить', 'посолить', 'добавить', 'варить',
+    'запекать', 'минут', 'на', 'среднем', 'огне', 'до', 'готовности',
+    'подавать', 'горячим', 'с', 'зеленью', 'и', 'перцем', 'тщательно',
+)
+# Exponents of random() ** skew: the larger, the more the choice
+# is concentrated on the first (popular) users and recipes.
+AUTHOR_SKEW = 2
+POPULARITY_SKEW = 3
+
+
+def insert_rows(model, fields, rows, batch_size):
+    """
+    Insert tuples of values of the given fields, with COPY on PostgreSQL
+    and executemany elsewhere. Other columns get their field defaults.
+    Unlike bulk_create, no model instances are built and auto_now
+    fields keep the given values.
+    """
+    meta = model._meta
+    columns = [meta.get_field(name) for name in fields]
+    defaults = [
+        field for field in meta.concrete_fields
+        if field not in columns and not field.primary_key
+    ]
+    all_columns = columns + defaults
+    prepare = [
+        None if isinstance(field, (models.IntegerField, models.ForeignKey))
+        else field
+        for field in all_columns
+    ]
+    quote = connection.ops.quote_name
+    table = quote(meta.db_table)
+    names = ', '.join(quote(field.column) for field in all_columns)
+    total = 0
+    rows = iter(rows)
+    with connection.cursor() as cursor:
+        while True:
+            batch = list(islice(rows, batch_size))
+            if not batch:
+                break
+            default_values = tuple(field.get_default() for field in defaults)
+            values = [
+                tuple(
+                    value if field is None
+                    else field.get_db_prep_save(value, connection)
+                    for field, value in zip(prepare, row + default_values)
+                )
+                for row in batch
+            ]
+            if connection.vendor == 'postgresql':
+                buffer = io.StringIO()
+                csv.writer(buffer).writerows(values)
+                buffer.seek(0)
+                cursor.copy_expert(
+                    f'COPY {table} ({names}) FROM STDIN WITH (FORMAT csv)',
+                    buffer
+                )
+            else:
+                placeholders = ', '.join(['%s'] * len(all_columns))
+                cursor.executemany(
+                    f'INSERT INTO {table} ({names}) '
+                    f'VALUES ({placeholders})',
+                    values
+                )
+            total += len(batch)
+    return total
+
+
+def next_id(model):
+    return (model.objects.aggregate(Max('id'))['id__max'] or 0) + 1
+
+
+class Command(BaseCommand):
+    help = (
+        'Generate a seeded synthetic dataset: users, recipes with tags '
+        'and ingredients from the catalogue, favorites, shopping carts '
+        'and subscriptions with power-law popularity.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--recipes', type=int, default=5000)
+        parser.add_argument(
+            '--favorites', type=int, default=50000,
+            help='Upper bound, popular users and recipes saturate first.'
+        )
+        parser.add_argument(
+            '--carts', type=int, default=5000,
+            help='Upper bound of the shopping cart rows.'
+        )
+        parser.add_argument(
+            '--subscriptions', type=int, default=10000,
+            help='Upper bound of the subscriptions.'
+        )
+        parser.add_argument(
+            '--seed', type=int, default=0,
+            help='The same seed and sizes produce the same dataset.'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=10000,
+            help='Rows sent to the database per COPY or INSERT.'
+        )
+
+    def handle(self, *args, **options):
+        self.random = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        self.ingredients = list(
+            Ingredient.objects.values_list(
+                'id', 'name', 'measurement_unit_id'
+            ).order_by('id')
+        )
+        if not self.ingredients:
+            raise CommandError(
+                'The ingredient catalogue is empty, run load_ingredients.'
+            )
+        self.tags = list(Tag.objects.values_list('id', 'bit').order_by('id'))
+        if options['users'] < 2 or options['recipes'] < 1:
+            raise CommandError('At least 2 users and 1 recipe are needed.')
+
+        with transaction.atomic():
+            user_ids = self.generate_users(options['users'])
+            recipe_ids = self.generate_recipes(options['recipes'], user_ids)
+            self.report('favorites', self.generate_marks(
+                Favorites, options['favorites'], user_ids, recipe_ids
+            ))
+            self.report('shopping carts', self.generate_marks(
+                ShoppingCart, options['carts'], user_ids, recipe_ids
+            ))
+            self.report('subscriptions', self.generate_subscriptions(
+                options['subscriptions'], user_ids
+            ))
+            self.reset_sequences()
+            self.refresh_derived_data(recipe_ids)
+
+    def report(self, name, count):
+        self.stdout.write(f'Created {count} {name}.')
+
+    def skewed(self, size, skew):
+        """
+        Index below size, small indexes being the most likely.
+        """
+        return int(size * self.random.random() ** skew)
+
+    def sample_distinct(self, size, count, skew):
+        count = min(count, size)
+        chosen = set()
+        attempts = 0
+        while len(chosen) < count and attempts < 4 * count:
+            chosen.add(self.skewed(size, skew))
+            attempts += 1
+        return chosen
+
+    def generate_users(self, count):
+        first_id = next_id(User)
+        user_ids = range(first_id, first_id + count)
+        user = User()
+        user.set_password(PASSWORD)
+        password = user.password
+        now = timezone.now()
+        self.report('users', insert_rows(
+            User,
+            ('id', 'username', 'email', 'first_name', 'last_name',
+             'password', 'date_joined'),
+            (
+                (user_id, f'user{user_id}', f'user{user_id}@example.com',
+                 f'Имя{user_id}', f'Фамилия{user_id}', password, now)
+                for user_id in user_ids
+            ),
+            self.batch_size
+        ))
+        return user_ids
+
+    def get_placeholder_image(self):
+        """
+        The image storage names files by content,
+        so every run reuses the same file.
+        """
+        buffer = io.BytesIO()
+        Image.new('RGB', (64, 64), (230, 230, 230)).save(buffer, 'PNG')
+        name = Recipe._meta.get_field('image').storage.save(
+            PLACEHOLDER_IMAGE, ContentFile(buffer.getvalue())
+        )
+        if not has_renditions(name):
+            create_renditions(name)
+        return name
+
+    def generate_recipes(self, count, user_ids):
+        first_id = next_id(Recipe)
+        recipe_ids = range(first_id, first_id + count)
+        image = self.get_placeholder_image()
+        now = timezone.now()
+        recipe_ingredients = []
+        recipe_tags = []
+
+        def recipes():
+            for recipe_id in recipe_ids:
+                ingredients = self.random.sample(
+                    self.ingredients,
+                    min(self.random.randint(3, 10), len(self.ingredients))
+                )
+                tags = self.random.sample(
+                    self.tags, min(self.random.randint(1, 3), len(self.tags))
+                )
+                recipe_ingredients.extend(
+                    (recipe_id, ingredient_id, measurement_unit_id,
+                     self.random.randint(1, 50) * 10)
+                    for ingredient_id, _, measurement_unit_id in ingredients
+                )
+                recipe_tags.extend((recipe_id, tag_id) for tag_id, _ in tags)
+                tags_mask = 0
+                for _, bit in tags:
+                    tags_mask |= 1 << bit
+                pub_date = now - timedelta(
+                    seconds=self.random.randint(0, 365 * 24 * 60 * 60)
+                )
+                yield (
+                    recipe_id,
+                    f'{self.random.choice(DISHES)}: '
+                    + ', '.join(name for _, name, _ in ingredients[:2]),
+                    user_ids[self.skewed(len(user_ids), AUTHOR_SKEW)],
+                    self.random.randint(5, 180),
+                    image,
+                    ' '.join(self.random.choices(WORDS, k=40)).capitalize(),
+                    pub_date,
+                    pub_date,
+                    self.random.randint(1, 8),
+                    tags_mask,
+                )
+
+        created = 0
+        recipes = recipes()
+        while True:
+            # Links are flushed with every batch of recipes, so memory
+            # use does not grow with the number of recipes.
+            batch = list(islice(recipes, self.batch_size))
+            if not batch:
+                break
+            created += insert_rows(
+                Recipe,
+                ('id', 'name', 'author', 'cooking_time', 'image', 'text',
+                 'pub_date', 'updated_at', 'portions', 'tags_mask'),
+                batch, self.batch_size
+            )
+            insert_rows(
+                RecipeIngredient,
+                ('recipe', 'ingredient', 'measurement_unit', 'amount'),
+                recipe_ingredients, self.batch_size
+            )
+            insert_rows(
+                RecipeTag, ('recipe', 'tag'), recipe_tags, self.batch_size
+            )
+            recipe_ingredients.clear()
+            recipe_tags.clear()
+        self.report('recipes', created)
+        return recipe_ids
+
+    def generate_marks(self, model, count, user_ids, recipe_ids):
+        """
+        Favorites or shopping carts: every user marks a Pareto-distributed
+        number of distinct recipes, popular recipes more often.
+        """
+        average = count / len(user_ids)
+        now = timezone.now()
+        with_date = model is Favorites
+
+        def marks():
+            produced = 0
+            for user_id in user_ids:
+                number = int(self.random.paretovariate(1.5) * average / 3)
+                number = min(number, count - produced)
+                for index in self.sample_distinct(
+                    len(recipe_ids), number, POPULARITY_SKEW
+                ):
+                    produced += 1
+                    if with_date:
+                        yield (user_id, recipe_ids[index], now)
+                    else:
+                        yield (user_id, recipe_ids[index])
+                if produced >= count:
+                    return
+
+        fields = ('user', 'recipe', 'created_at') if with_date else (
+            'user', 'recipe'
+        )
+        return insert_rows(model, fields, marks(), self.batch_size)
+
+    def generate_subscriptions(self, count, user_ids):
+        """
+        Followers per author follow a power law: the first users
+        are followed by most of the others.
+        """
+        average = count / len(user_ids)
+
+        def subscriptions():
+            produced = 0
+            for follower_id in user_ids:
+                number = int(self.random.paretovariate(1.5) * average / 3)
+                number = min(number, count - produced)
+                for index in self.sample_distinct(
+                    len(user_ids), number, POPULARITY_SKEW
+                ):
+                    if user_ids[index] != follower_id:
+                        produced += 1
+                        yield (follower_id, user_ids[index])
+                if produced >= count:
+                    return
+
+        return insert_rows(
+            Subscription, ('follower', 'following'), subscriptions(),
+            self.batch_size
+        )
+
+    def reset_sequences(self):
+        """
+        Ids were set explicitly, so move the sequences past them.
+        """
+        statements = connection.ops.sequence_reset_sql(
+            no_style(), [User, Recipe]
+        )
+        with connection.cursor() as cursor:
+            for sql in statements:
+                cursor.execute(sql)
+
+    def refresh_derived_data(self, recipe_ids):
+        """
+        Rows inserted without signals: recompute the counters,
+        shopping lists and search data and drop the caches.
+        """
+        reconcile_counters()
+        rebuild_shopping_lists()
+        update_search_vectors(
+            Recipe.objects.filter(id__gte=recipe_ids.start).values('id')
+        )
+        invalidate_recipe_index()
+        invalidate_all_recipes()
+        reset_cached_counts()
+        bump_version(RECIPES_VERSION)
+        self.stdout.write(self.style.SUCCESS('Derived data refreshed.'))
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+
+from recipes.images import create_renditions, has_renditions
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = 'Create the missing renditions of recipe images.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force', action='store_true',
+            help='Recreate renditions that already exist.'
+        )
+
+    def handle(self, *args, **options):
+        names = Recipe.objects.exclude(image='').exclude(
+            image__isnull=True
+        ).values_list('image', flat=True).distinct().iterator()
+        created = failed = 0
+        for name in names:
+            if not options['force'] and has_renditions(name):
+                continue
+            try:
+                create_renditions(name)
+            except (OSError, ValueError) as error:
+                failed += 1
+                self.stderr.write(f'{name}: {error}')
+                continue
+            created += 1
+        self.stdout.write(self.style.SUCCESS(
+            f'Renditions created for {created} images, {failed} failed.'
+        ))
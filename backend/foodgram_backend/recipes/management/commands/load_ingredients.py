@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from recipes.ingredient_import import IngredientImporter, read_rows
+
+
+class Command(BaseCommand):
+    help = (
+        'Load ingredients from a CSV file with "name,measurement unit" '
+        'rows or from a JSON file with a list of objects.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Path to a .csv or .json file.')
+        parser.add_argument(
+            '--chunk-size', type=int, default=None,
+            help='Rows inserted per bulk_create.'
+        )
+
+    def handle(self, *args, **options):
+        kwargs = {'progress': self.report_progress}
+        if options['chunk_size']:
+            kwargs['chunk_size'] = options['chunk_size']
+        importer = IngredientImporter(**kwargs)
+        try:
+            with open(options['path'], 'rb') as file:
+                importer.run(read_rows(file, options['path']))
+        except (OSError, ValueError, UnicodeDecodeError) as error:
+            if importer.processed:
+                self.report_progress(importer)
+            raise CommandError(error)
+
+        for line, error in importer.errors:
+            self.stderr.write(f'Row {line}: {error}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Ingredients loaded: {importer.created} created, '
+            f'{importer.existing} existing, {len(importer.errors)} errors.'
+        ))
+
+    def report_progress(self, importer):
+        self.stdout.write(
+            f'Processed {importer.processed} rows: '
+            f'{importer.created} created, {importer.existing} existing.'
+        )
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from recipes.counters import reconcile_counters
+from recipes.pagination import reset_cached_counts
+
+
+class Command(BaseCommand):
+    help = (
+        'Recompute recipes_count, followers_count and favorites_count '
+        'from the database and fold the favorites counter shards.'
+    )
+
+    def handle(self, *args, **options):
+        users, recipes = reconcile_counters()
+        reset_cached_counts()
+        self.stdout.write(self.style.SUCCESS(
+            f'Counters reconciled: {users} users, {recipes} recipes.'
+        ))
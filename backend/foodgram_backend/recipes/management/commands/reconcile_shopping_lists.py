@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from recipes.shopping_list import rebuild_shopping_lists
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the shopping list items of every user from the carts.'
+
+    def handle(self, *args, **options):
+        created = rebuild_shopping_lists()
+        self.stdout.write(self.style.SUCCESS(
+            f'Shopping lists rebuilt: {created} items.'
+        ))
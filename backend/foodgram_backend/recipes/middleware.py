@@ -1,11 +1,21 @@
+import json
 import logging
+import random
+from contextlib import ExitStack
 from logging.handlers import RotatingFileHandler
+from time import perf_counter
 
+from django.db import connections
 from foodgram_backend.settings import (LOGS_BACKUP_COUNT, LOGS_MAX_BYTES,
-                                       LOGS_ROOT)
+                                       LOGS_ROOT, REQUEST_LOG_SAMPLE_RATE,
+                                       SERVER_TIMING_PUBLIC,
+                                       SLOW_REQUEST_THRESHOLD,
+                                       SLOW_REQUEST_THRESHOLDS)
+
+from recipes.instrumentation import RequestMetrics, current_metrics
 
 logger = logging.getLogger(__name__)
-logger.setLevel(logging.ERROR)
+logger.setLevel(logging.INFO)
 
 handler = RotatingFileHandler(f"{LOGS_ROOT}{__name__}.log",
                               maxBytes=LOGS_MAX_BYTES,
@@ -15,11 +25,140 @@ handler.setFormatter(formatter)
 logger.addHandler(handler)
 
 
-class RequestLoggingMiddleware:
+def milliseconds(seconds):
+    return round(seconds * 1000, 1)
+
+
+class InstrumentationMiddleware:
+    """
+    Measures the wall time, SQL queries, serialization and rendering
+    of every request. The timings are sent in the Server-Timing header
+    to staff users (to everyone with SERVER_TIMING_PUBLIC) and logged
+    as a JSON line: always as a warning when the request is slower than
+    the threshold of its view, otherwise for a REQUEST_LOG_SAMPLE_RATE
+    share of the requests.
+    """
+
     def __init__(self, get_response):
         self.get_response = get_response
 
     def __call__(self, request):
-        logger.info(f'Request method: {request.method}, path: {request.path}')
-        response = self.get_response(request)
+        metrics = RequestMetrics()
+        token = current_metrics.set(metrics)
+        try:
+            with self.count_queries(metrics):
+                response = self.get_response(request)
+        finally:
+            current_metrics.reset(token)
+        if self.shows_timing(request):
+            response['Server-Timing'] = self.get_server_timing(
+                metrics, response.streaming
+            )
+        if response.streaming:
+            response.streaming_content = self.log_streamed(
+                request, response, metrics, response.streaming_content
+            )
+        else:
+            self.log(request, response, metrics, len(response.content))
+        return response
+
+    def count_queries(self, metrics):
+        stack = ExitStack()
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(metrics))
+        return stack
+
+    def process_template_response(self, request, response):
+        """
+        Time the rendering of DRF responses, done after the view returns.
+        """
+        render = response.render
+        metrics = current_metrics.get()
+
+        def measured_render():
+            with metrics.measure('render'):
+                return render()
+
+        response.render = measured_render
         return response
+
+    def shows_timing(self, request):
+        user = getattr(request, 'user', None)
+        return SERVER_TIMING_PUBLIC or bool(user and user.is_staff)
+
+    def get_server_timing(self, metrics, streaming=False):
+        """
+        A streamed response sends the header before its content,
+        so the timings only cover the work done up to then.
+        """
+        description = f'{metrics.sql_count} queries'
+        if streaming:
+            description += ' before streaming'
+        timings = [
+            f'total;dur={milliseconds(metrics.duration)}',
+            f'db;dur={milliseconds(metrics.sql_time)};'
+            f'desc="{description}"',
+        ]
+        timings.extend(
+            f'{name};dur={milliseconds(duration)}'
+            for name, duration in metrics.timings.items()
+        )
+        return ', '.join(timings)
+
+    def log_streamed(self, request, response, metrics, content):
+        """
+        Pass the streamed chunks through, logging the request once
+        the whole response has been sent. Queries made while streaming
+        are counted in the log. Rows fetched from a server-side cursor
+        bypass the execute wrapper, so the time spent producing
+        the chunks is logged as 'stream'.
+        """
+        size = 0
+        try:
+            with self.count_queries(metrics):
+                chunks = iter(content)
+                while True:
+                    start = perf_counter()
+                    try:
+                        chunk = next(chunks)
+                    except StopIteration:
+                        break
+                    finally:
+                        metrics.timings['stream'] += perf_counter() - start
+                    size += len(chunk)
+                    yield chunk
+        finally:
+            self.log(request, response, metrics, size)
+
+    def get_view_name(self, request):
+        match = getattr(request, 'resolver_match', None)
+        return match.view_name if match else None
+
+    def log(self, request, response, metrics, size):
+        view_name = self.get_view_name(request)
+        duration = metrics.duration
+        threshold = SLOW_REQUEST_THRESHOLDS.get(
+            view_name, SLOW_REQUEST_THRESHOLD
+        )
+        slow = duration > threshold
+        if not slow and random.random() >= REQUEST_LOG_SAMPLE_RATE:
+            return
+        record = {
+            'method': request.method,
+            'path': request.path,
+            'view': view_name,
+            'status': response.status_code,
+            'duration_ms': milliseconds(duration),
+            'sql_count': metrics.sql_count,
+            'sql_ms': milliseconds(metrics.sql_time),
+            'size': size,
+            'slow': slow,
+        }
+        record.update(
+            (f'{name}_ms', milliseconds(duration))
+            for name, duration in metrics.timings.items()
+        )
+        logger.log(
+            logging.WARNING if slow else logging.INFO,
+            json.dumps(record, ensure_ascii=False)
+        )
@@ -0,0 +1,31 @@
+# Generated by Django 3.2.3 on 2026-10-18 18:00
+
+from django.db import migrations
+from django.db.models import OuterRef, Subquery
+
+
+def fill_measurement_units(apps, schema_editor):
+    """
+    Rows created with bulk_create skipped RecipeIngredient.save()
+    and were left without a measurement unit.
+    """
+    Ingredient = apps.get_model('recipes', 'Ingredient')
+    RecipeIngredient = apps.get_model('recipes', 'RecipeIngredient')
+    RecipeIngredient.objects.filter(measurement_unit__isnull=True).update(
+        measurement_unit=Subquery(
+            Ingredient.objects.filter(
+                pk=OuterRef('ingredient_id')
+            ).values('measurement_unit')[:1]
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0018_user_recipe_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_measurement_units, migrations.RunPython.noop),
+    ]
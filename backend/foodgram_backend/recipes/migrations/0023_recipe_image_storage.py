@@ -0,0 +1,19 @@
+# Generated by Django 3.2.3 on 2026-10-18 18:12
+
+from django.db import migrations, models
+import recipes.storage
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0022_shopping_list_items'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='recipe',
+            name='image',
+            field=models.ImageField(default=None, null=True, storage=recipes.storage.ContentAddressedStorage(), upload_to='recipe_images/', verbose_name='изображение'),
+        ),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 3.2.3 on 2026-10-18 18:40
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def merge_rows(queryset, ingredient_id, fields):
+    """
+    Move the rows to the ingredient. A row that would duplicate
+    a row of the ingredient with the same fields is added
+    to that row's amount and deleted.
+    """
+    for row in queryset:
+        merged = queryset.model.objects.filter(
+            ingredient_id=ingredient_id,
+            **{field: getattr(row, field) for field in fields}
+        ).update(amount=models.F('amount') + row.amount)
+        if merged:
+            row.delete()
+        else:
+            row.ingredient_id = ingredient_id
+            row.save(update_fields=['ingredient'])
+
+
+def merge_duplicate_ingredients(apps, schema_editor):
+    """
+    Point the rows referencing a duplicate ingredient to the first one
+    with the same name and measurement unit, then delete the duplicates.
+    """
+    Ingredient = apps.get_model('recipes', 'Ingredient')
+    RecipeIngredient = apps.get_model('recipes', 'RecipeIngredient')
+    ShoppingListItem = apps.get_model('recipes', 'ShoppingListItem')
+    groups = Ingredient.objects.values(
+        'name', 'measurement_unit'
+    ).annotate(first_id=Min('id'), count=Count('id')).filter(count__gt=1)
+    for group in groups:
+        duplicate_ids = list(Ingredient.objects.filter(
+            name=group['name'], measurement_unit=group['measurement_unit']
+        ).exclude(id=group['first_id']).values_list('id', flat=True))
+        merge_rows(
+            RecipeIngredient.objects.filter(ingredient_id__in=duplicate_ids),
+            group['first_id'], ('recipe_id', )
+        )
+        merge_rows(
+            ShoppingListItem.objects.filter(ingredient_id__in=duplicate_ids),
+            group['first_id'], ('user_id', 'measurement_unit_id')
+        )
+        Ingredient.objects.filter(id__in=duplicate_ids).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0023_recipe_image_storage'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            merge_duplicate_ingredients, migrations.RunPython.noop
+        ),
+    ]
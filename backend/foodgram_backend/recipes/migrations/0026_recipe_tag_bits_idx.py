@@ -0,0 +1,60 @@
+# Generated by Django 3.2.3 on 2026-10-18 18:49
+
+import django.contrib.postgres.indexes
+from django.db import migrations
+
+import recipes.models
+
+TAG_BITS_INDEX = django.contrib.postgres.indexes.GinIndex(
+    recipes.models.TagBits('tags_mask'), name='recipe_tag_bits_idx'
+)
+
+
+def create_tag_bits_index(apps, schema_editor):
+    """
+    The index is built over an immutable function expanding the mask
+    into the array of its bits, PostgreSQL only; other databases
+    filter by the mask itself.
+    """
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        "CREATE FUNCTION recipe_tag_bits(mask bigint) RETURNS integer[] "
+        "LANGUAGE sql IMMUTABLE PARALLEL SAFE AS $$ "
+        "SELECT coalesce(array_agg(bit), '{}') "
+        "FROM generate_series(0, 62) AS bit "
+        "WHERE mask & (1::bigint << bit) <> 0 $$"
+    )
+    Recipe = apps.get_model('recipes', 'Recipe')
+    schema_editor.add_index(Recipe, TAG_BITS_INDEX)
+
+
+def drop_tag_bits_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    Recipe = apps.get_model('recipes', 'Recipe')
+    schema_editor.remove_index(Recipe, TAG_BITS_INDEX)
+    schema_editor.execute('DROP FUNCTION recipe_tag_bits(bigint)')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0025_ingredient_unique_name_unit'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AddIndex(
+                    model_name='recipe',
+                    index=TAG_BITS_INDEX,
+                ),
+            ],
+            database_operations=[
+                migrations.RunPython(
+                    create_tag_bits_index, drop_tag_bits_index
+                ),
+            ],
+        ),
+    ]
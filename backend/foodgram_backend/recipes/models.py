@@ -1,9 +1,14 @@
+from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
+from django.core.exceptions import ValidationError
 from django.db import models
-from foodgram_backend.settings import (DISPLAY_TEXT_MAX_LENGTH,
+from foodgram_backend.settings import (DISPLAY_TEXT_MAX_LENGTH, MAX_TAGS,
                                        NAME_MAX_LENGTH, SLUG_MAX_LENGHT)
 from foodgram_backend.translat_dict import get_name as _
-from users.models import User
+from users.models import CounterFieldsMixin, User
 
+from recipes.storage import ContentAddressedStorage
 from recipes.validators import (ColorValidator, validate_cooking_time,
                                 validate_ingredients_amount, validate_portions)
 
@@ -23,6 +28,10 @@ class Tag(models.Model):
         max_length=16,
         validators=[ColorValidator()]
     )
+    bit = models.PositiveSmallIntegerField(
+        verbose_name=_('bit'),
+        unique=True, editable=False,
+    )
 
     class Meta:
         verbose_name = _('tag')
@@ -32,6 +41,17 @@ class Tag(models.Model):
     def __str__(self):
         return self.name[:DISPLAY_TEXT_MAX_LENGTH]
 
+    def save(self, *args, **kwargs):
+        if self.bit is None:
+            used_bits = set(Tag.objects.values_list('bit', flat=True))
+            free_bits = set(range(MAX_TAGS)) - used_bits
+            if not free_bits:
+                raise ValidationError(
+                    f'There can be at most {MAX_TAGS} tags.'
+                )
+            self.bit = min(free_bits)
+        super().save(*args, **kwargs)
+
 
 class MeasurementUnit(models.Model):
     name = models.CharField(
@@ -66,12 +86,28 @@ class Ingredient(models.Model):
         verbose_name = _('ingredient'),
         verbose_name_plural = _('Ingredients')
         ordering = ('name', )
+        constraints = [
+            models.UniqueConstraint(
+                fields=('name', 'measurement_unit'),
+                name='unique_ingredient_unit'
+            ),
+        ]
 
     def __str__(self):
         return self.name[:DISPLAY_TEXT_MAX_LENGTH]
 
 
-class Recipe(models.Model):
+class TagBits(models.Func):
+    """
+    Bits set in Recipe.tags_mask as an integer array. The function only
+    exists on PostgreSQL, where the array is GIN-indexed, so a tag filter
+    is an indexable && instead of a bitwise AND over every row.
+    """
+    function = 'recipe_tag_bits'
+    output_field = ArrayField(models.IntegerField())
+
+
+class Recipe(CounterFieldsMixin, models.Model):
     name = models.CharField(
         max_length=NAME_MAX_LENGTH,
         verbose_name=_('name')
@@ -94,6 +130,7 @@ class Recipe(models.Model):
     )
     image = models.ImageField(
         upload_to='recipe_images/',
+        storage=ContentAddressedStorage(),
         verbose_name=_('image'),
         null=True, default=None,
     )
@@ -104,16 +141,47 @@ class Recipe(models.Model):
         verbose_name=_('publication date'),
         auto_now_add=True, db_index=True
     )
+    updated_at = models.DateTimeField(
+        verbose_name=_('update date'),
+        auto_now=True
+    )
     portions = models.PositiveIntegerField(
         verbose_name=_('portions'),
         validators=[validate_portions],
         default=1, blank=True,
     )
+    search_vector = SearchVectorField(
+        null=True, editable=False,
+    )
+    tags_mask = models.BigIntegerField(
+        verbose_name=_('tags mask'),
+        default=0, editable=False,
+    )
+    favorites_count = models.PositiveIntegerField(
+        verbose_name=_('favorites count'),
+        default=0, editable=False,
+    )
+
+    # Columns maintained with queryset updates, never written by save().
+    counter_fields = ('favorites_count', 'tags_mask', 'search_vector')
 
     class Meta:
         verbose_name = _('recipe'),
         verbose_name_plural = _('Recipes')
         ordering = ('-pub_date', )
+        indexes = [
+            models.Index(
+                fields=('-pub_date', '-id'), name='recipe_pub_date_id_idx'
+            ),
+            models.Index(
+                fields=('author', '-pub_date', '-id'),
+                name='recipe_author_pub_date_idx'
+            ),
+            GinIndex(
+                fields=('search_vector', ), name='recipe_search_vector_idx'
+            ),
+            GinIndex(TagBits('tags_mask'), name='recipe_tag_bits_idx'),
+        ]
 
     def __str__(self):
         return self.name[:DISPLAY_TEXT_MAX_LENGTH]
@@ -171,6 +239,15 @@ class Favorites(models.Model):
     class Meta:
         verbose_name = _('favorite'),
         verbose_name_plural = _('Favorites')
+        indexes = [
+            models.Index(
+                fields=('user', 'recipe'), name='favorites_user_recipe_idx'
+            ),
+            models.Index(
+                fields=('user', '-created_at'),
+                name='favorites_user_created_idx'
+            ),
+        ]
 
 
 class ShoppingCart(models.Model):
@@ -183,3 +260,95 @@ class ShoppingCart(models.Model):
     class Meta:
         verbose_name = _('shopping cart'),
         verbose_name_plural = _('Shopping Carts')
+        indexes = [
+            models.Index(
+                fields=('user', 'recipe'), name='cart_user_recipe_idx'
+            ),
+        ]
+
+
+class ShoppingListItem(models.Model):
+    """
+    Total amount of an ingredient in the recipes of a user's shopping
+    cart, kept up to date with deltas as the cart and its recipes change.
+    """
+    user = models.ForeignKey(
+        User, verbose_name=_('user'),
+        on_delete=models.CASCADE, related_name='shopping_list_items'
+    )
+    ingredient = models.ForeignKey(
+        Ingredient, verbose_name=_('ingredient'),
+        on_delete=models.CASCADE
+    )
+    measurement_unit = models.ForeignKey(
+        MeasurementUnit, verbose_name=_('measurement unit'),
+        on_delete=models.SET_NULL, null=True
+    )
+    amount = models.FloatField(verbose_name=_('amount'))
+
+    class Meta:
+        verbose_name = _('shopping list item')
+        verbose_name_plural = _('Shopping List Items')
+        constraints = [
+            models.UniqueConstraint(
+                fields=('user', 'ingredient', 'measurement_unit'),
+                name='unique_shopping_list_item'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.user} {self.ingredient}'[:DISPLAY_TEXT_MAX_LENGTH]
+
+
+class FavoritesCounterShard(models.Model):
+    """
+    Part of the favorites counter of a popular recipe.
+    Concurrent increments go to random shards instead of
+    contending for the recipe row; the total is the sum of the shards
+    and Recipe.favorites_count.
+    """
+    recipe = models.ForeignKey(
+        Recipe, verbose_name=_('recipe'),
+        on_delete=models.CASCADE, related_name='favorites_count_shards'
+    )
+    shard = models.PositiveSmallIntegerField(verbose_name=_('shard'))
+    count = models.IntegerField(verbose_name=_('count'), default=0)
+
+    class Meta:
+        verbose_name = _('favorites counter shard')
+        verbose_name_plural = _('Favorites Counter Shards')
+        constraints = [
+            models.UniqueConstraint(
+                fields=('recipe', 'shard'), name='unique_recipe_shard'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.recipe} {self.shard}'[:DISPLAY_TEXT_MAX_LENGTH]
+
+
+class TableVersion(models.Model):
+    """
+    Version counter of a table or of a user's marks, used to answer
+    conditional GET requests without loading the objects.
+    """
+    name = models.CharField(
+        verbose_name=_('Name'),
+        max_length=NAME_MAX_LENGTH,
+        unique=True,
+    )
+    version = models.PositiveBigIntegerField(
+        verbose_name=_('version'),
+        default=0,
+    )
+    updated_at = models.DateTimeField(
+        verbose_name=_('update date'),
+        auto_now=True
+    )
+
+    class Meta:
+        verbose_name = _('table version')
+        verbose_name_plural = _('Table Versions')
+
+    def __str__(self):
+        return f'{self.name} {self.version}'[:DISPLAY_TEXT_MAX_LENGTH]
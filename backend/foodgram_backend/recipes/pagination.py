@@ -0,0 +1,199 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from hashlib import md5
+
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
+from foodgram_backend.settings import (MAX_PAGE_SIZE,
+                                       PAGINATION_APPROXIMATE_COUNT_THRESHOLD,
+                                       PAGINATION_COUNT_CACHE_TIMEOUT)
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import (BasePagination, PageNumberPagination,
+                                       _positive_int)
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from recipes.cache import bump_cache_version, get_cache_version
+
+COUNT_VERSION_KEY = 'pagination_count_version'
+
+
+def reset_cached_counts():
+    """
+    Invalidate every cached list count by bumping the shared version.
+    """
+    bump_cache_version(COUNT_VERSION_KEY)
+
+
+class CachedCountPaginator(Paginator):
+    """
+    Paginator that caches the total count of a queryset per SQL query,
+    so every filter combination pays for COUNT(*) once per timeout.
+    Large unfiltered tables are counted from PostgreSQL statistics.
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list.values('pk').order_by()
+        try:
+            sql = str(queryset.query)
+        except EmptyResultSet:
+            return 0
+
+        version = get_cache_version(COUNT_VERSION_KEY)
+        cache_key = 'pagination_count:{}:{}'.format(
+            version, md5(sql.encode()).hexdigest()
+        )
+        count = cache.get(cache_key)
+        if count is None:
+            count = self.approximate_count(queryset)
+            if count is None:
+                count = queryset.count()
+            cache.set(cache_key, count, PAGINATION_COUNT_CACHE_TIMEOUT)
+        return count
+
+    def approximate_count(self, queryset):
+        if queryset.query.where:
+            return None
+        connection = connections[queryset.db]
+        if connection.vendor != 'postgresql':
+            return None
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT reltuples FROM pg_class WHERE relname = %s',
+                [queryset.model._meta.db_table]
+            )
+            row = cursor.fetchone()
+        if row is None or row[0] < PAGINATION_APPROXIMATE_COUNT_THRESHOLD:
+            return None
+        return int(row[0])
+
+
+class PageLimitPagination(PageNumberPagination):
+    """
+    Page number pagination with the 'page' and 'limit' parameters
+    the frontend sends, backed by cached counts.
+    """
+    page_size_query_param = 'limit'
+    max_page_size = MAX_PAGE_SIZE
+    django_paginator_class = CachedCountPaginator
+
+
+class RecipeCursorPagination(BasePagination):
+    """
+    Keyset pagination for recipes ordered by ('-pub_date', '-id').
+    The cursor is an opaque token with the position of the last
+    (or first) recipe of the page, so every page is a single indexed
+    range query whatever its depth. A queryset already ordered
+    otherwise, e.g. by search rank, is rejected: the keyset would
+    drop its ordering.
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'limit'
+    page_size = api_settings.PAGE_SIZE
+    max_page_size = MAX_PAGE_SIZE
+    invalid_cursor_message = 'Invalid cursor.'
+    ordered_queryset_message = (
+        'The cursor cannot be combined with search or ordering, '
+        'use the page parameter instead.'
+    )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        position, reverse = self.decode_cursor(request)
+        if queryset.query.order_by:
+            raise ValidationError(
+                {self.cursor_query_param: [self.ordered_queryset_message]}
+            )
+
+        if reverse:
+            queryset = queryset.order_by('pub_date', 'id')
+        else:
+            queryset = queryset.order_by('-pub_date', '-id')
+
+        if position is not None:
+            pub_date, pk = position
+            if reverse:
+                queryset = queryset.filter(
+                    Q(pub_date__gt=pub_date)
+                    | Q(pub_date=pub_date, id__gt=pk)
+                )
+            else:
+                queryset = queryset.filter(
+                    Q(pub_date__lt=pub_date)
+                    | Q(pub_date=pub_date, id__lt=pk)
+                )
+
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        self.page = results[:self.page_size]
+
+        if reverse:
+            self.page.reverse()
+            self.has_next = position is not None
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = position is not None
+        return self.page
+
+    def get_page_size(self, request):
+        try:
+            return _positive_int(
+                request.query_params[self.page_size_query_param],
+                strict=True,
+                cutoff=self.max_page_size
+            )
+        except (KeyError, ValueError):
+            return self.page_size
+
+    def encode_cursor(self, recipe, reverse):
+        data = {'d': recipe.pub_date.isoformat(), 'i': recipe.id}
+        if reverse:
+            data['r'] = 1
+        token = urlsafe_b64encode(json.dumps(data).encode()).decode()
+        return replace_query_param(
+            self.base_url, self.cursor_query_param, token
+        )
+
+    def decode_cursor(self, request):
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None, False
+        try:
+            data = json.loads(urlsafe_b64decode(token.encode()).decode())
+            pub_date = parse_datetime(data['d'])
+            pk = int(data['i'])
+            reverse = bool(data.get('r'))
+        except (TypeError, ValueError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+        if pub_date is None:
+            raise NotFound(self.invalid_cursor_message)
+        return (pub_date, pk), reverse
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
@@ -0,0 +1,100 @@
+import io
+import json
+
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+from django.http.multipartparser import MultiPartParserError
+from foodgram_backend.settings import (DATA_UPLOAD_MAX_MEMORY_SIZE,
+                                       IMAGE_MAX_UPLOAD_SIZE)
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from rest_framework.parsers import DataAndFiles, JSONParser, MultiPartParser
+
+# Fields sent as repeated form values or as JSON arrays.
+LIST_FIELDS = ('tags', 'ingredients')
+
+
+class RequestBodyTooLarge(APIException):
+    status_code = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    default_detail = (
+        f'Request body must not exceed {DATA_UPLOAD_MAX_MEMORY_SIZE} bytes.'
+    )
+    default_code = 'request_body_too_large'
+
+
+class LimitedJSONParser(JSONParser):
+    """
+    Reads at most DATA_UPLOAD_MAX_MEMORY_SIZE bytes of a JSON body.
+    DRF reads the request stream itself, so Django's own check
+    of the setting does not apply.
+    """
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        request = (parser_context or {}).get('request')
+        if request is not None:
+            try:
+                content_length = int(request.META.get('CONTENT_LENGTH') or 0)
+            except ValueError:
+                content_length = 0
+            if content_length > DATA_UPLOAD_MAX_MEMORY_SIZE:
+                raise RequestBodyTooLarge()
+        # The length may be missing, e.g. with chunked encoding.
+        body = stream.read(DATA_UPLOAD_MAX_MEMORY_SIZE + 1)
+        if len(body) > DATA_UPLOAD_MAX_MEMORY_SIZE:
+            raise RequestBodyTooLarge()
+        return super().parse(io.BytesIO(body), media_type, parser_context)
+
+
+class LimitedTemporaryFileUploadHandler(TemporaryFileUploadHandler):
+    """
+    Writes uploaded files to temporary files and stops the upload
+    as soon as the body or a file is larger than allowed.
+    """
+
+    def handle_raw_input(self, input_data, META, content_length, boundary,
+                         encoding=None):
+        max_length = IMAGE_MAX_UPLOAD_SIZE + DATA_UPLOAD_MAX_MEMORY_SIZE
+        if content_length > max_length:
+            raise MultiPartParserError('Request body is too large.')
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.size = 0
+
+    def receive_data_chunk(self, raw_data, start):
+        self.size += len(raw_data)
+        if self.size > IMAGE_MAX_UPLOAD_SIZE:
+            self.file.close()
+            raise MultiPartParserError(
+                f'File size must not exceed {IMAGE_MAX_UPLOAD_SIZE} bytes.'
+            )
+        return super().receive_data_chunk(raw_data, start)
+
+
+class RecipeMultiPartParser(MultiPartParser):
+    """
+    Multipart recipe data: the image is a file field, tags and ingredients
+    are repeated fields or JSON arrays, as in the JSON body.
+    """
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parsed = super().parse(stream, media_type, parser_context)
+        data = {}
+        for key, values in parsed.data.lists():
+            if key not in LIST_FIELDS:
+                data[key] = values[-1]
+                continue
+            items = []
+            for value in values:
+                try:
+                    value = json.loads(value)
+                except ValueError:
+                    pass
+                if isinstance(value, list):
+                    items.extend(value)
+                else:
+                    items.append(value)
+            data[key] = items
+        # A plain dict: DRF merges the files into the data with
+        # dict.update(), which would copy MultiValueDict lists.
+        files = {key: parsed.files[key] for key in parsed.files}
+        return DataAndFiles(data, files)
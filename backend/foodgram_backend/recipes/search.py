@@ -0,0 +1,423 @@
+import re
+from bisect import bisect_left, bisect_right
+from collections import Counter, defaultdict
+from threading import Lock
+
+from django.contrib.postgres.search import (SearchQuery, SearchRank,
+                                            SearchVector)
+from django.db import connections, transaction
+from django.db.models import (BigIntegerField, Case, ExpressionWrapper, F,
+                              IntegerField, OuterRef, Subquery, Sum, Value,
+                              When)
+from django.db.models.functions import Cast, Coalesce
+from foodgram_backend.settings import (INGREDIENT_FUZZY_LIMIT,
+                                       INGREDIENT_FUZZY_THRESHOLD)
+from transliterate import translit
+
+from recipes.cache import bump_cache_version, get_cache_version
+from recipes.models import Ingredient, Recipe, RecipeTag, Tag
+from recipes.stemmer import stem
+
+INGREDIENT_INDEX_VERSION_KEY = 'ingredient_index_version'
+RECIPE_INDEX_VERSION_KEY = 'recipe_search_index_version'
+TAG_INDEX_VERSION_KEY = 'tag_index_version'
+SEARCH_CONFIG = 'russian'
+# Weights of the recipe name ('A') and text ('B') in the in-process index.
+NAME_WEIGHT = 1.0
+TEXT_WEIGHT = 0.4
+
+# Russian letters typed with the keyboard left in the Latin layout.
+LATIN_TO_CYRILLIC_LAYOUT = str.maketrans(
+    "qwertyuiop[]asdfghjkl;'zxcvbnm,.`",
+    'йцукенгшщзхъфывапролджэячсмитьбюё'
+)
+
+
+def normalize(text):
+    return text.strip().lower().replace('ё', 'е')
+
+
+def get_trigrams(text):
+    """
+    Trigrams of every word padded with spaces, as pg_trgm does.
+    """
+    trigrams = set()
+    for word in text.split():
+        word = f'  {word} '
+        trigrams.update(word[i:i + 3] for i in range(len(word) - 2))
+    return trigrams
+
+
+def word_distance(query, word, bound):
+    """
+    Levenshtein distance from the query to the word, or to the start
+    of the word plus one, whichever is lower.
+    Returns bound + 1 once the distance is known to exceed the bound.
+    """
+    if len(word) < len(query) - bound:
+        return bound + 1
+    previous = list(range(len(word) + 1))
+    for i, query_char in enumerate(query, 1):
+        current = [i]
+        for j, word_char in enumerate(word, 1):
+            current.append(min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (query_char != word_char),
+            ))
+        if min(current) > bound:
+            return bound + 1
+        previous = current
+    distance = previous[-1]
+    if len(word) > len(query):
+        distance = min(distance, previous[len(query)] + 1)
+    return min(distance, bound + 1)
+
+
+def get_query_variants(query):
+    """
+    The query as typed, in the Cyrillic keyboard layout
+    and transliterated to Cyrillic.
+    """
+    variants = [query]
+    if any('a' <= char <= 'z' for char in query):
+        for variant in (
+            query.translate(LATIN_TO_CYRILLIC_LAYOUT),
+            normalize(translit(query, 'ru')),
+        ):
+            if variant not in variants:
+                variants.append(variant)
+    return variants
+
+
+class IngredientIndex:
+    """
+    Per-process index of ingredient names for autocomplete.
+    Names are kept sorted, so prefix matches are a binary search;
+    substring matches are ranked after them.
+    The index is rebuilt lazily when the catalogue version changes.
+    """
+
+    def __init__(self):
+        self.version = None
+        self.keys = []
+        self.items = []
+        self.text = ''
+        self.offsets = []
+        self.trigrams = []
+        self.postings = {}
+        self.lock = Lock()
+
+    def build(self, version):
+        ingredients = Ingredient.objects.select_related(
+            'measurement_unit'
+        ).order_by()
+        entries = []
+        for ingredient in ingredients:
+            measurement_unit = ingredient.measurement_unit
+            entries.append((normalize(ingredient.name), ingredient.id, {
+                'id': ingredient.id,
+                'name': ingredient.name,
+                'measurement_unit': (
+                    measurement_unit.name if measurement_unit else None
+                ),
+            }))
+        entries.sort(key=lambda entry: entry[:2])
+        self.keys = [key for key, _, _ in entries]
+        self.items = [item for _, _, item in entries]
+        # All names in one string, so substring search runs in C.
+        self.text = '\n'.join(self.keys)
+        self.offsets = []
+        offset = 0
+        for key in self.keys:
+            self.offsets.append(offset)
+            offset += len(key) + 1
+        self.trigrams = [get_trigrams(key) for key in self.keys]
+        postings = defaultdict(list)
+        for position, trigrams in enumerate(self.trigrams):
+            for trigram in trigrams:
+                postings[trigram].append(position)
+        self.postings = dict(postings)
+        self.version = version
+
+    def ensure_fresh(self):
+        version = get_cache_version(INGREDIENT_INDEX_VERSION_KEY)
+        if version != self.version:
+            with self.lock:
+                if version != self.version:
+                    self.build(version)
+
+    def all(self):
+        self.ensure_fresh()
+        return list(self.items)
+
+    def search(self, query):
+        """
+        Return ingredients whose name starts with the query,
+        followed by those containing it.
+        """
+        self.ensure_fresh()
+        query = normalize(query)
+        if not query:
+            return list(self.items)
+        return [self.items[position] for position in self.match(query)]
+
+    def match(self, query):
+        """
+        Positions of the names starting with or containing the query.
+        """
+        start = bisect_left(self.keys, query)
+        end = start
+        while end < len(self.keys) and self.keys[end].startswith(query):
+            end += 1
+        substring_matches = []
+        found = self.text.find(query)
+        while found != -1:
+            position = bisect_right(self.offsets, found) - 1
+            if start <= position < end:
+                # Prefix matches are already taken, skip past them.
+                position = end - 1
+            else:
+                substring_matches.append(
+                    (found - self.offsets[position], position)
+                )
+            if position + 1 == len(self.offsets):
+                break
+            found = self.text.find(query, self.offsets[position + 1])
+        substring_matches.sort()
+        return list(range(start, end)) + [
+            position for _, position in substring_matches
+        ]
+
+    def edit_score(self, query, position, distances):
+        """
+        Short words share few trigrams, so a name with a word within
+        one or two edits of the query (or starting with such a word)
+        is also a match. It is ranked below the trigram matches.
+        """
+        bound = 1 if len(query) <= 4 else 2
+        distance = bound + 1
+        for word in self.keys[position].split():
+            if word not in distances:
+                distances[word] = word_distance(query, word, bound)
+            distance = min(distance, distances[word])
+        if distance > bound:
+            return None
+        return INGREDIENT_FUZZY_THRESHOLD * (1 - distance / len(query))
+
+    def fuzzy_search(self, query, limit=INGREDIENT_FUZZY_LIMIT):
+        """
+        Search tolerant to typos and to the Latin keyboard layout.
+        Exact matches of any query variant come first, followed by
+        names ranked by trigram similarity.
+        """
+        self.ensure_fresh()
+        query = normalize(query)
+        if not query:
+            return list(self.items[:limit])
+
+        variants = get_query_variants(query)
+        positions = []
+        for variant in variants:
+            positions.extend(self.match(variant))
+
+        scores = {}
+        for variant in variants:
+            distances = {}
+            trigrams = get_trigrams(variant)
+            shared = Counter(
+                position
+                for trigram in trigrams
+                for position in self.postings.get(trigram, ())
+            )
+            for position, count in shared.items():
+                score = count / (
+                    len(trigrams) + len(self.trigrams[position]) - count
+                )
+                if score < INGREDIENT_FUZZY_THRESHOLD:
+                    if count < 2:
+                        continue
+                    score = self.edit_score(variant, position, distances)
+                    if not score:
+                        continue
+                scores[position] = max(score, scores.get(position, 0))
+        positions.extend(sorted(
+            scores, key=lambda p: (-scores[p], len(self.keys[p]), p)
+        ))
+
+        result = []
+        seen = set()
+        for position in positions:
+            if position not in seen:
+                seen.add(position)
+                result.append(self.items[position])
+                if len(result) == limit:
+                    break
+        return result
+
+
+class RecipeSearchIndex:
+    """
+    Per-process inverted index of stemmed recipe names and texts.
+    Used for full-text search on databases without tsvector support,
+    e.g. SQLite in local development.
+    """
+
+    def __init__(self):
+        self.version = None
+        self.postings = {}
+        self.lock = Lock()
+
+    def build(self, version):
+        postings = defaultdict(lambda: defaultdict(float))
+        recipes = Recipe.objects.order_by().values_list('id', 'name', 'text')
+        for recipe_id, name, text in recipes:
+            for words, weight in ((name, NAME_WEIGHT), (text, TEXT_WEIGHT)):
+                for token in get_stems(words):
+                    postings[token][recipe_id] += weight
+        self.postings = {
+            token: dict(documents) for token, documents in postings.items()
+        }
+        self.version = version
+
+    def ensure_fresh(self):
+        version = get_cache_version(RECIPE_INDEX_VERSION_KEY)
+        if version != self.version:
+            with self.lock:
+                if version != self.version:
+                    self.build(version)
+
+    def search(self, query):
+        """
+        Return ids of the recipes containing every word of the query,
+        most relevant first.
+        """
+        self.ensure_fresh()
+        tokens = set(get_stems(query))
+        if not tokens:
+            return []
+        documents = [self.postings.get(token, {}) for token in tokens]
+        documents.sort(key=len)
+        scores = {
+            recipe_id: sum(document[recipe_id] for document in documents)
+            for recipe_id in documents[0]
+            if all(recipe_id in document for document in documents[1:])
+        }
+        return sorted(scores, key=lambda recipe_id: -scores[recipe_id])
+
+
+class TagIndex:
+    """
+    Per-process map of tag slugs to their bits in Recipe.tags_mask.
+    """
+
+    def __init__(self):
+        self.version = None
+        self.bits = {}
+        self.lock = Lock()
+
+    def ensure_fresh(self):
+        version = get_cache_version(TAG_INDEX_VERSION_KEY)
+        if version != self.version:
+            with self.lock:
+                if version != self.version:
+                    self.bits = dict(Tag.objects.values_list('slug', 'bit'))
+                    self.version = version
+
+    def get_bits(self, slugs):
+        """
+        Sorted bits of the given tags, unknown slugs are ignored.
+        """
+        self.ensure_fresh()
+        return sorted({self.bits[slug] for slug in slugs if slug in self.bits})
+
+
+def get_stems(text):
+    return [stem(word) for word in re.findall(r'\w+', text.lower())]
+
+
+def search_recipes(queryset, value):
+    """
+    Filter recipes by a full-text query and order them by relevance.
+    """
+    if connections[queryset.db].vendor == 'postgresql':
+        query = SearchQuery(
+            value, config=SEARCH_CONFIG, search_type='websearch'
+        )
+        return queryset.filter(search_vector=query).annotate(
+            search_rank=SearchRank(F('search_vector'), query)
+        ).order_by('-search_rank', '-pub_date')
+
+    recipe_ids = recipe_index.search(value)
+    return queryset.filter(id__in=recipe_ids).order_by(
+        Case(
+            *[When(id=recipe_id, then=Value(position))
+              for position, recipe_id in enumerate(recipe_ids)],
+            output_field=IntegerField()
+        ),
+        '-pub_date'
+    )
+
+
+def update_search_vectors(recipe_ids):
+    """
+    Refresh the search vectors of the recipes after their name
+    or text has changed.
+    """
+    if connections[Recipe.objects.db].vendor == 'postgresql':
+        Recipe.objects.filter(id__in=recipe_ids).update(
+            search_vector=(
+                SearchVector('name', weight='A', config=SEARCH_CONFIG)
+                + SearchVector('text', weight='B', config=SEARCH_CONFIG)
+            )
+        )
+    else:
+        invalidate_recipe_index()
+
+
+def update_tags_masks(recipe_ids):
+    """
+    Recompute Recipe.tags_mask from the RecipeTag rows of the recipes
+    in a single UPDATE. Tags have distinct bits, so the sum of distinct
+    bit values is their bitwise OR.
+    """
+    masks = RecipeTag.objects.filter(
+        recipe_id=OuterRef('pk')
+    ).values('recipe_id').annotate(
+        mask=Sum(
+            ExpressionWrapper(
+                Cast(Value(1), BigIntegerField()).bitleftshift(F('tag__bit')),
+                output_field=BigIntegerField()
+            ),
+            distinct=True
+        )
+    ).values('mask')
+    Recipe.objects.filter(id__in=recipe_ids).update(
+        tags_mask=Coalesce(Subquery(masks), 0)
+    )
+
+
+def invalidate_index(key):
+    """
+    Bump the index version once the current transaction commits.
+    Bumped earlier, a concurrent request could rebuild the index from
+    the old rows and keep it under the new version.
+    """
+    transaction.on_commit(lambda: bump_cache_version(key))
+
+
+def invalidate_ingredient_index():
+    invalidate_index(INGREDIENT_INDEX_VERSION_KEY)
+
+
+def invalidate_recipe_index():
+    invalidate_index(RECIPE_INDEX_VERSION_KEY)
+
+
+def invalidate_tag_index():
+    invalidate_index(TAG_INDEX_VERSION_KEY)
+
+
+ingredient_index = IngredientIndex()
+recipe_index = RecipeSearchIndex()
+tag_index = TagIndex()
@@ -1,17 +1,32 @@
-
 import base64
+import binascii
 import logging
+from collections import OrderedDict, defaultdict
 from logging.handlers import RotatingFileHandler
 
 from django.core.files.base import ContentFile
+from django.db import transaction
+from django.db.models import F, Manager, Window, prefetch_related_objects
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import RowNumber
 from foodgram_backend.settings import (LOGS_BACKUP_COUNT, LOGS_MAX_BYTES,
                                        LOGS_ROOT, NAME_MAX_LENGTH)
 from rest_framework import serializers
+from tasks.queue import enqueue
 from users.serializers import UserGETSerializer
 
+from recipes.cache import (get_recipe_fragments, get_recipe_prefetches,
+                           invalidate_recipes, set_recipe_fragments)
+from recipes.conditional import touch_recipes
+from recipes.counters import get_favorites_count
+from recipes.images import get_rendition_urls
+from recipes.instrumentation import MeasuredSerializerMixin
 from recipes.models import (Favorites, Ingredient, MeasurementUnit, Recipe,
                             RecipeIngredient, RecipeTag, ShoppingCart, Tag)
-from recipes.validators import validate_ingredients_amount
+from recipes.tasks import rebuild_shopping_lists
+from recipes.validators import (validate_image_dimensions,
+                                validate_image_size,
+                                validate_ingredients_amount)
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.ERROR)
@@ -25,34 +40,48 @@ logger.addHandler(handler)
 
 class Base64ImageField(serializers.ImageField):
     """
-    Custom ImageField to handle base64 encoded images.
+    Custom ImageField to handle base64 encoded images and uploaded files.
+    The size and pixel dimensions are checked before the image is decoded.
     """
     def to_internal_value(self, data):
         if isinstance(data, str) and data.startswith('data:image'):
-            format, imgstr = data.split(';base64,')
+            try:
+                format, imgstr = data.split(';base64,')
+            except ValueError:
+                self.fail('invalid_image')
+            validate_image_size(len(imgstr) * 3 // 4)
             ext = format.split('/')[-1]
-            data = ContentFile(base64.b64decode(imgstr), name='temp.' + ext)
+            try:
+                content = base64.b64decode(imgstr, validate=True)
+            except binascii.Error:
+                self.fail('invalid_image')
+            data = ContentFile(content, name='temp.' + ext)
+        if hasattr(data, 'size') and hasattr(data, 'seek'):
+            validate_image_size(data.size)
+            validate_image_dimensions(data)
         return super().to_internal_value(data)
 
     def to_representation(self, value):
         return value.url
 
 
-class TagSerializer(serializers.ModelSerializer):
+class TagSerializer(MeasuredSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Tag
         fields = ('id', 'name', 'color', 'slug')
         read_only_fields = ('id', 'name', 'color', 'slug')
 
 
-class MeasurementUnitSerializer(serializers.ModelSerializer):
+class MeasurementUnitSerializer(MeasuredSerializerMixin,
+                                serializers.ModelSerializer):
 
     class Meta:
         model = MeasurementUnit
         fields = ('name',)
 
 
-class IngredientSerializer(serializers.ModelSerializer):
+class IngredientSerializer(MeasuredSerializerMixin,
+                           serializers.ModelSerializer):
     measurement_unit = serializers.CharField()
 
     class Meta:
@@ -68,6 +97,15 @@ class RecipeTagSerializer(serializers.PrimaryKeyRelatedField):
     'tags' field should receive data in the form list[int] list of IDs
     and should response data in the form of list of JSON objects.
     """
+    def to_internal_value(self, data):
+        tags_by_id = getattr(self.root, 'tags_by_id', None)
+        if tags_by_id:
+            try:
+                return tags_by_id[int(data)]
+            except (KeyError, TypeError, ValueError):
+                pass
+        return super().to_internal_value(data)
+
     def to_representation(self, value):
         return {
             'id': value.id,
@@ -81,6 +119,8 @@ class RecipeIngredientSerializer(serializers.Serializer):
     """
     Serializer for RecipeIngredient model.
     It is a nested  serializer for  RecipeSerializer field 'ingredients'.
+    Renders RecipeIngredient objects, so the amount, name and measurement
+    unit come from the prefetched 'recipe_ingredients' of the recipe.
     """
     id = serializers.IntegerField()
     name = serializers.CharField(required=False, read_only=True)
@@ -93,17 +133,60 @@ class RecipeIngredientSerializer(serializers.Serializer):
         return data
 
     def to_representation(self, value):
-        value.amount = None
-        return super().to_representation(value)
+        ingredient = value.ingredient
+        measurement_unit = ingredient.measurement_unit
+        return {
+            'id': ingredient.id,
+            'name': ingredient.name,
+            'measurement_unit': (
+                measurement_unit.name if measurement_unit else None
+            ),
+            'amount': value.amount,
+        }
+
 
+class RecipeListSerializer(MeasuredSerializerMixin,
+                           serializers.ListSerializer):
+    """
+    Renders a page of recipes with a single cache lookup and prefetches
+    tags and ingredients only for the recipes missing from the cache.
+    """
+    def to_representation(self, data):
+        recipes = list(data.all() if isinstance(data, Manager) else data)
+        self.child.fragments = get_recipe_fragments(
+            [recipe.id for recipe in recipes]
+        )
+        prefetch_related_objects(
+            [recipe for recipe in recipes
+             if recipe.id not in self.child.fragments],
+            *get_recipe_prefetches()
+        )
+        return [self.child.to_representation(recipe) for recipe in recipes]
 
-class RecipeSerializer(serializers.ModelSerializer):
-    ingredients = RecipeIngredientSerializer(many=True)
+
+class RecipeSerializer(MeasuredSerializerMixin, serializers.ModelSerializer):
+    """
+    Serializer for Recipe model.
+    The user-independent part of a recipe is cached per recipe id,
+    the current user's flags are added to it on every response.
+    """
+    # Fields filled on every response instead of being cached.
+    user_fields = ('is_favorited', 'is_in_shopping_cart', 'favorites_count')
+    fragments = None
+    # Tags and ingredients referenced by the data, loaded in is_valid().
+    tags_by_id = None
+    ingredients_by_id = None
+
+    ingredients = RecipeIngredientSerializer(
+        many=True, source='recipe_ingredients'
+    )
     tags = RecipeTagSerializer(many=True, queryset=Tag.objects.all())
     image = Base64ImageField()
+    image_renditions = serializers.SerializerMethodField()
     author = UserGETSerializer(read_only=True)
     is_favorited = serializers.SerializerMethodField()
     is_in_shopping_cart = serializers.SerializerMethodField()
+    favorites_count = serializers.SerializerMethodField()
     name = serializers.CharField(max_length=NAME_MAX_LENGTH)
 
     # To deploy to remote server:
@@ -113,74 +196,186 @@ class RecipeSerializer(serializers.ModelSerializer):
         model = Recipe
         fields = (
             'id', 'tags', 'author', 'ingredients',
-            'is_favorited', 'is_in_shopping_cart',
-            'name', 'image', 'text', 'cooking_time',
+            'is_favorited', 'is_in_shopping_cart', 'favorites_count',
+            'name', 'image', 'image_renditions', 'text', 'cooking_time',
         )
         read_only_fields = (
             'id', 'author', 'is_favorited',
-            'is_in_shopping_cart'
+            'is_in_shopping_cart', 'favorites_count'
         )
+        list_serializer_class = RecipeListSerializer
+
+    def build_recipe_ingredients(self, recipe, ingredients_data):
+        """
+        RecipeIngredient objects for bulk_create, which skips save(),
+        so the measurement unit is filled in here.
+        """
+        recipe_ingredients = []
+        for ingredient_data in ingredients_data:
+            ingredient = self.ingredients_by_id[int(ingredient_data['id'])]
+            recipe_ingredients.append(RecipeIngredient(
+                recipe=recipe,
+                ingredient=ingredient,
+                measurement_unit_id=ingredient.measurement_unit_id,
+                amount=ingredient_data.get('amount')
+            ))
+        return recipe_ingredients
 
+    def update_tags(self, recipe, tags):
+        """
+        Add and remove only the tags that differ from the current ones.
+        """
+        current_ids = set(
+            RecipeTag.objects.filter(recipe=recipe).values_list(
+                'tag_id', flat=True)
+        )
+        new_ids = {tag.id for tag in tags}
+        removed_ids = current_ids - new_ids
+        if removed_ids:
+            recipe.tags.remove(*removed_ids)
+        added = [tag for tag in tags if tag.id not in current_ids]
+        if added:
+            recipe.tags.add(*added)
+
+    def update_ingredients(self, recipe, ingredients_data):
+        """
+        Insert, update and delete only the changed RecipeIngredient rows.
+        """
+        current = {
+            recipe_ingredient.ingredient_id: recipe_ingredient
+            for recipe_ingredient in RecipeIngredient.objects.filter(
+                recipe=recipe)
+        }
+        new_data = []
+        changed = []
+        # Changes of the amounts for the shopping lists.
+        deltas = defaultdict(float)
+        for ingredient_data in ingredients_data:
+            recipe_ingredient = current.pop(
+                int(ingredient_data['id']), None
+            )
+            if recipe_ingredient is None:
+                new_data.append(ingredient_data)
+                continue
+            amount = float(ingredient_data.get('amount'))
+            if recipe_ingredient.amount != amount:
+                deltas[(recipe_ingredient.ingredient_id,
+                        recipe_ingredient.measurement_unit_id)] += (
+                    amount - recipe_ingredient.amount
+                )
+                recipe_ingredient.amount = amount
+                changed.append(recipe_ingredient)
+
+        if current:
+            for recipe_ingredient in current.values():
+                deltas[(recipe_ingredient.ingredient_id,
+                        recipe_ingredient.measurement_unit_id)] -= (
+                    recipe_ingredient.amount
+                )
+            RecipeIngredient.objects.filter(
+                id__in=[row.id for row in current.values()]
+            ).delete()
+        if changed:
+            RecipeIngredient.objects.bulk_update(changed, ['amount'])
+        if new_data:
+            new_rows = self.build_recipe_ingredients(recipe, new_data)
+            for recipe_ingredient in new_rows:
+                deltas[(recipe_ingredient.ingredient_id,
+                        recipe_ingredient.measurement_unit_id)] += float(
+                    recipe_ingredient.amount
+                )
+            RecipeIngredient.objects.bulk_create(new_rows)
+        if any(deltas.values()):
+            # Rebuilt rather than patched with the deltas, as the carts
+            # may change before the worker runs.
+            user_ids = list(ShoppingCart.objects.filter(
+                recipe=recipe).values_list('user_id', flat=True))
+            if user_ids:
+                enqueue(rebuild_shopping_lists, user_ids)
+
+    @transaction.atomic
     def update(self, instance, validated_data):
         tags_data = validated_data.pop('tags', [])
-        ingredients_data = validated_data.pop('ingredients', [])
+        ingredients_data = validated_data.pop('recipe_ingredients', [])
         for attr, value in validated_data.items():
             setattr(instance, attr, value)
         instance.save()
 
         if tags_data:
-            RecipeTag.objects.filter(recipe=instance).delete()
-            instance.tags.set(tags_data)
+            self.update_tags(instance, tags_data)
 
         if ingredients_data:
-            RecipeIngredient.objects.filter(recipe=instance).delete()
-            RecipeIngredient.objects.bulk_create([
-                RecipeIngredient(
-                    recipe=instance,
-                    ingredient=Ingredient.objects.get(pk=ingredient.get('id')),
-                    amount=ingredient.get('amount')
-                )
-                for ingredient in ingredients_data
-            ])
+            self.update_ingredients(instance, ingredients_data)
+        invalidate_recipes([instance.id])
+        touch_recipes([instance.id])
         return instance
 
+    @transaction.atomic
     def create(self, validated_data):
         tags_data = validated_data.pop('tags', [])
-        ingredients = validated_data.pop('ingredients', [])
+        ingredients = validated_data.pop('recipe_ingredients', [])
         recipe = Recipe.objects.create(**validated_data)
         recipe.tags.set(tags_data)
 
-        RecipeIngredient.objects.bulk_create([
-            RecipeIngredient(
-                recipe=recipe,
-                ingredient=Ingredient.objects.get(pk=ingredient.get('id')),
-                amount=ingredient.get('amount')
-            )
-            for ingredient in ingredients
-        ])
+        RecipeIngredient.objects.bulk_create(
+            self.build_recipe_ingredients(recipe, ingredients)
+        )
         logger.info(
             f"RecipeIngredient objects created for recipe id={recipe.id}"
         )
         return recipe
 
-    def to_representation(self, value):
-        recipe_id = value.id
-        json_data = super().to_representation(value)
-        recipe_ingredients = RecipeIngredient.objects.filter(
-            recipe=recipe_id).values('ingredient', 'amount')
-
-        for ingredient in json_data['ingredients']:
-            current_amount = recipe_ingredients.get(
-                ingredient=ingredient['id']).get('amount')
-            ingredient['amount'] = current_amount
-        return json_data
-
-    def nested_list_validate(self, nested_list, model):
+    def to_representation(self, instance):
+        if self.fragments is None:
+            fragment = get_recipe_fragments([instance.id]).get(instance.id)
+        else:
+            fragment = self.fragments.get(instance.id)
+        if fragment is None:
+            fragment = self.get_fragment(instance)
+            set_recipe_fragments({instance.id: fragment})
+
+        data = OrderedDict(fragment)
+        data['author'] = OrderedDict(
+            fragment['author'],
+            is_subscribed=self.fields['author'].get_is_subscribed(
+                instance.author
+            ),
+            followers_count=instance.author.followers_count
+        )
+        data['is_favorited'] = self.get_is_favorited(instance)
+        data['is_in_shopping_cart'] = self.get_is_in_shopping_cart(instance)
+        data['favorites_count'] = self.get_favorites_count(instance)
+        return data
+
+    def get_fragment(self, instance):
+        """
+        Render the part of the recipe that is the same for every user.
+        """
+        prefetch_related_objects([instance], *get_recipe_prefetches())
+        fragment = OrderedDict()
+        for field in self._readable_fields:
+            if field.field_name in self.user_fields:
+                fragment[field.field_name] = None
+            elif field.field_name == 'author':
+                fragment['author'] = UserGETSerializer(instance.author).data
+            else:
+                attribute = field.get_attribute(instance)
+                fragment[field.field_name] = (
+                    None if attribute is None
+                    else field.to_representation(attribute)
+                )
+        return fragment
+
+    def nested_list_validate(self, nested_list, model, queryset=None):
         """  Validate data in the fields 'ingredient' or 'tags'
 
         Args:
             nested_list ([int]): list of IDs
             model (_type_): model Ingredient of Tag
+            queryset (QuerySet): queryset to load the objects from
+
+        Returns:
+            dict: objects by id, loaded with a single query
         """
         model_name = model.__name__
         if len(nested_list) == 0:
@@ -188,16 +383,27 @@ class RecipeSerializer(serializers.ModelSerializer):
                 '{model_name} list cannot be empty.'
             )
 
+        try:
+            nested_list = [int(id) for id in nested_list]
+        except (TypeError, ValueError):
+            raise serializers.ValidationError(
+                f'{model_name} id must be an integer.'
+            )
+
         if len(set(nested_list)) != len(nested_list):
             raise serializers.ValidationError(
                 f'Duplicate {model_name} id error.'
             )
 
+        if queryset is None:
+            queryset = model.objects.all()
+        objects = queryset.in_bulk(nested_list)
         for id in nested_list:
-            if not model.objects.filter(pk=id).exists():
+            if id not in objects:
                 raise serializers.ValidationError(
                     f"There is no {model_name} with id={id}"
                 )
+        return objects
 
     def is_valid(self, *, raise_exception=False):
         fields = ['name', 'text', 'cooking_time', 'tags', 'ingredients']
@@ -215,22 +421,35 @@ class RecipeSerializer(serializers.ModelSerializer):
         ingredients_data = self.initial_data.get('ingredients', [])
         ingredients_id = [ingredient['id'] for ingredient in ingredients_data]
 
-        self.nested_list_validate(tags_id, Tag)
-        self.nested_list_validate(ingredients_id, Ingredient)
-        return super().is_valid(raise_exception=False)
+        self.tags_by_id = self.nested_list_validate(tags_id, Tag)
+        self.ingredients_by_id = self.nested_list_validate(
+            ingredients_id, Ingredient,
+            Ingredient.objects.only('id', 'measurement_unit')
+        )
+        return super().is_valid(raise_exception=raise_exception)
 
     def get_is_favorited(self, obj):
         request = self.context.get('request')
         if request and request.user.is_authenticated:
+            if hasattr(obj, 'is_favorited'):
+                return obj.is_favorited
             return Favorites.objects.filter(
                 user=request.user,
                 recipe=obj
             ).exists()
         return False
 
+    def get_image_renditions(self, obj):
+        return get_rendition_urls(obj.image)
+
+    def get_favorites_count(self, obj):
+        return get_favorites_count(obj)
+
     def get_is_in_shopping_cart(self, obj):
         request = self.context.get('request')
         if request and request.user.is_authenticated:
+            if hasattr(obj, 'is_in_shopping_cart'):
+                return obj.is_in_shopping_cart
             return ShoppingCart.objects.filter(
                 user=request.user,
                 recipe=obj
@@ -238,42 +457,100 @@ class RecipeSerializer(serializers.ModelSerializer):
         return False
 
 
-class LimitedRecipeSerializer(serializers.ModelSerializer):
+class LimitedRecipeSerializer(MeasuredSerializerMixin,
+                              serializers.ModelSerializer):
     """
     Serializer for Recipe model for shortened representation.
     """
+    image = Base64ImageField(read_only=True)
+    image_renditions = serializers.SerializerMethodField()
 
     class Meta:
         model = Recipe
-        fields = ('id', 'name', 'image', 'cooking_time')
+        fields = ('id', 'name', 'image', 'image_renditions', 'cooking_time')
+
+    def get_image_renditions(self, obj):
+        return get_rendition_urls(obj.image)
+
+
+def get_recipes_limit(recipes_limit):
+    """
+    Positive integer value of the 'recipes_limit' parameter or None.
+    """
+    if recipes_limit is not None and str(recipes_limit).isdigit():
+        if int(recipes_limit) > 0:
+            return int(recipes_limit)
+    return None
+
+
+def prefetch_author_recipes(authors, recipes_limit=None):
+    """
+    Attach the latest recipes to every author in one query.
+    With a limit only the top rows of each author are fetched,
+    ranked by ROW_NUMBER() OVER (PARTITION BY author).
+    """
+    authors = [author for author in authors
+               if not hasattr(author, 'latest_recipes')]
+    if not authors:
+        return
+    author_ids = [author.id for author in authors]
+    recipes = Recipe.objects.filter(author_id__in=author_ids).only(
+        'id', 'author_id', 'name', 'image', 'cooking_time'
+    ).order_by('-pub_date', '-id')
+
+    recipes_limit = get_recipes_limit(recipes_limit)
+    if recipes_limit is not None:
+        ranked = Recipe.objects.filter(author_id__in=author_ids).annotate(
+            row_number=Window(
+                expression=RowNumber(),
+                partition_by=[F('author_id')],
+                order_by=[F('pub_date').desc(), F('id').desc()]
+            )
+        ).order_by().values('id', 'row_number')
+        sql, params = ranked.query.sql_with_params()
+        recipes = recipes.filter(id__in=RawSQL(
+            f'SELECT "id" FROM ({sql}) AS ranked '
+            f'WHERE "row_number" <= %s',
+            (*params, recipes_limit)
+        ))
+
+    recipes_by_author = defaultdict(list)
+    for recipe in recipes:
+        recipes_by_author[recipe.author_id].append(recipe)
+    for author in authors:
+        author.latest_recipes = recipes_by_author[author.id]
+
+
+class UserRecipesListSerializer(MeasuredSerializerMixin,
+                                serializers.ListSerializer):
+    """
+    Loads the recipes of a whole page of authors at once.
+    """
+    def to_representation(self, data):
+        authors = list(data.all() if isinstance(data, Manager) else data)
+        prefetch_author_recipes(authors, self.context.get('recipes_limit'))
+        return [self.child.to_representation(author) for author in authors]
 
 
 class UserRecipesSerializer(UserGETSerializer):
     """
     Serializer for User model with related recipes.
     """
-    recipes = LimitedRecipeSerializer(many=True, read_only=True)
-    recipes_count = serializers.SerializerMethodField()
+    recipes = LimitedRecipeSerializer(
+        many=True, read_only=True, source='latest_recipes'
+    )
 
     class Meta(UserGETSerializer.Meta):
         fields = (
             'id', 'username', 'first_name', 'last_name',
-            'email', 'is_subscribed',
+            'email', 'is_subscribed', 'followers_count',
             'recipes_count', 'recipes'
         )
-
-    def get_recipes_count(self, obj):
-        return obj.recipes.count()
+        list_serializer_class = UserRecipesListSerializer
 
     def to_internal_value(self, data):
         return super().to_internal_value(data)
 
     def to_representation(self, value):
-        recipes_limit = self.context.get('recipes_limit')
-        ret = super().to_representation(value)
-
-        if recipes_limit is not None and recipes_limit.isdigit():
-            if int(recipes_limit) > 0:
-                ret["recipes"] = ret["recipes"][:int(recipes_limit)]
-
-        return ret
+        prefetch_author_recipes([value], self.context.get('recipes_limit'))
+        return super().to_representation(value)
@@ -0,0 +1,311 @@
+import csv
+import os
+from collections import defaultdict
+from itertools import islice
+from tempfile import SpooledTemporaryFile
+
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import F, Sum
+from foodgram_backend.settings import (PDF_FONT_PATH,
+                                       SHOPPING_LIST_CACHE_MAX_SIZE,
+                                       SHOPPING_LIST_CACHE_TIMEOUT,
+                                       SHOPPING_LIST_CHUNK_SIZE)
+from foodgram_backend.translat_dict import get_name as _
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.units import mm
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.pdfgen.canvas import Canvas
+from rest_framework.renderers import BaseRenderer
+
+from recipes.cache import bump_cache_version, get_cache_version
+from recipes.models import RecipeIngredient, ShoppingCart, ShoppingListItem
+
+SHOPPING_LIST_VERSION_KEY = 'shopping_list_version:{user_id}'
+SHOPPING_LIST_CACHE_KEY = 'shopping_list:{user_id}:{version}:{format}'
+# Items whose amount drops to this value are removed.
+SHOPPING_LIST_AMOUNT_EPSILON = 1e-9
+PDF_FONT_NAME = 'ShoppingListFont'
+PDF_FALLBACK_FONT_NAME = 'Helvetica'
+PDF_FONT_SIZE = 11
+PDF_TITLE_FONT_SIZE = 16
+PDF_LINE_HEIGHT = 7 * mm
+PDF_MARGIN = 20 * mm
+# Size of the chunks a rendered PDF is sent in, and of the part
+# of it kept in memory before spilling to a temporary file.
+PDF_CHUNK_SIZE = 64 * 1024
+PDF_MAX_MEMORY_SIZE = 1024 * 1024
+
+
+def get_shopping_list(user):
+    """
+    Iterate over (ingredient, measurement unit, total amount) rows
+    of the user's shopping list. The rows are read in chunks,
+    with a server-side cursor on PostgreSQL.
+    """
+    return ShoppingListItem.objects.filter(user=user).values_list(
+        'ingredient__name', 'measurement_unit__name', 'amount'
+    ).order_by(
+        'ingredient__name', 'measurement_unit__name'
+    ).iterator(chunk_size=SHOPPING_LIST_CHUNK_SIZE)
+
+
+def get_recipe_amounts(recipe_id):
+    """
+    Return {(ingredient id, measurement unit id): amount} of a recipe.
+    """
+    amounts = defaultdict(float)
+    for ingredient_id, measurement_unit_id, amount in (
+        RecipeIngredient.objects.filter(recipe_id=recipe_id).values_list(
+            'ingredient_id', 'measurement_unit_id', 'amount')
+    ):
+        amounts[(ingredient_id, measurement_unit_id)] += amount
+    return amounts
+
+
+@transaction.atomic
+def apply_shopping_list_deltas(user_ids, deltas):
+    """
+    Add the amounts {(ingredient id, measurement unit id): delta}
+    to the shopping lists of the users.
+    """
+    user_ids = set(user_ids)
+    deltas = {key: delta for key, delta in deltas.items() if delta}
+    if not user_ids or not deltas:
+        return
+
+    existing = defaultdict(set)
+    for user_id, ingredient_id, measurement_unit_id in (
+        ShoppingListItem.objects.filter(
+            user_id__in=user_ids,
+            ingredient_id__in={ingredient_id for ingredient_id, _ in deltas}
+        ).values_list('user_id', 'ingredient_id', 'measurement_unit_id')
+    ):
+        existing[(ingredient_id, measurement_unit_id)].add(user_id)
+
+    new_items = []
+    for (ingredient_id, measurement_unit_id), delta in deltas.items():
+        owners = existing[(ingredient_id, measurement_unit_id)]
+        if owners:
+            ShoppingListItem.objects.filter(
+                user_id__in=owners,
+                ingredient_id=ingredient_id,
+                measurement_unit_id=measurement_unit_id,
+            ).update(amount=F('amount') + delta)
+        if delta > 0:
+            new_items.extend(
+                ShoppingListItem(
+                    user_id=user_id,
+                    ingredient_id=ingredient_id,
+                    measurement_unit_id=measurement_unit_id,
+                    amount=delta,
+                )
+                for user_id in user_ids - owners
+            )
+    try:
+        with transaction.atomic():
+            ShoppingListItem.objects.bulk_create(new_items)
+    except IntegrityError:
+        # A concurrent request has created some of the items.
+        rebuild_shopping_lists(user_ids)
+        return
+    ShoppingListItem.objects.filter(
+        user_id__in=user_ids, amount__lte=SHOPPING_LIST_AMOUNT_EPSILON
+    ).delete()
+    bump_shopping_list_versions(user_ids)
+
+
+@transaction.atomic
+def rebuild_shopping_lists(user_ids=None):
+    """
+    Recompute the shopping lists of the users (of everyone by default)
+    from their carts. Returns the number of created items.
+    """
+    items = ShoppingListItem.objects.all()
+    carts = ShoppingCart.objects.all()
+    if user_ids is not None:
+        items = items.filter(user_id__in=user_ids)
+        carts = carts.filter(user_id__in=user_ids)
+    affected = set(items.values_list('user_id', flat=True).distinct())
+    affected.update(carts.values_list('user_id', flat=True).distinct())
+    items.delete()
+
+    totals = carts.filter(
+        recipe__recipe_ingredients__isnull=False
+    ).values_list(
+        'user_id',
+        'recipe__recipe_ingredients__ingredient_id',
+        'recipe__recipe_ingredients__measurement_unit_id',
+    ).annotate(
+        total_amount=Sum('recipe__recipe_ingredients__amount')
+    ).order_by().iterator(chunk_size=SHOPPING_LIST_CHUNK_SIZE)
+    created = 0
+    while True:
+        batch = [
+            ShoppingListItem(
+                user_id=user_id,
+                ingredient_id=ingredient_id,
+                measurement_unit_id=measurement_unit_id,
+                amount=total_amount,
+            )
+            for user_id, ingredient_id, measurement_unit_id, total_amount
+            in islice(totals, SHOPPING_LIST_CHUNK_SIZE)
+        ]
+        if not batch:
+            break
+        ShoppingListItem.objects.bulk_create(batch)
+        created += len(batch)
+    bump_shopping_list_versions(affected)
+    return created
+
+
+def get_shopping_list_cache_key(user_id, format):
+    version = get_cache_version(
+        SHOPPING_LIST_VERSION_KEY.format(user_id=user_id)
+    )
+    return SHOPPING_LIST_CACHE_KEY.format(
+        user_id=user_id, version=version, format=format
+    )
+
+
+def bump_shopping_list_versions(user_ids):
+    """
+    Invalidate the cached lists of the users once the current transaction
+    commits. Bumped earlier, a concurrent download could cache the old
+    list under the new version.
+    """
+    user_ids = list(user_ids)
+
+    def bump():
+        for user_id in user_ids:
+            bump_cache_version(
+                SHOPPING_LIST_VERSION_KEY.format(user_id=user_id)
+            )
+
+    transaction.on_commit(bump)
+
+
+def cache_stream(chunks, cache_key):
+    """
+    Pass the chunks of a rendered file through and cache the file
+    when it is small enough.
+    """
+    content = []
+    size = 0
+    for chunk in chunks:
+        if size <= SHOPPING_LIST_CACHE_MAX_SIZE:
+            data = chunk.encode() if isinstance(chunk, str) else chunk
+            content.append(data)
+            size += len(data)
+        yield chunk
+    if size <= SHOPPING_LIST_CACHE_MAX_SIZE:
+        cache.set(cache_key, b''.join(content), SHOPPING_LIST_CACHE_TIMEOUT)
+
+
+def format_amount(amount):
+    return f'{amount:g}' if amount is not None else ''
+
+
+class Echo:
+    """
+    File-like object that returns what is written to it,
+    so csv.writer produces rows one by one.
+    """
+    def write(self, value):
+        return value
+
+
+class ShoppingListRenderer(BaseRenderer):
+    """
+    Base renderer of the shopping list download.
+    The view streams stream(rows) itself, the renderer is used for content
+    negotiation by the 'format' parameter and for error responses.
+    """
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if isinstance(data, dict):
+            data = data.get('detail', data)
+        return str(data).encode(self.charset or 'utf-8')
+
+    def stream(self, rows):
+        raise NotImplementedError
+
+
+class ShoppingListCSVRenderer(ShoppingListRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
+
+    def stream(self, rows):
+        writer = csv.writer(Echo())
+        yield writer.writerow(
+            (_('Ingredient'), _('Amount'), _('Measurement Unit'))
+        )
+        for name, measurement_unit, total_amount in rows:
+            yield writer.writerow((name, total_amount, measurement_unit))
+
+
+class ShoppingListTextRenderer(ShoppingListRenderer):
+    media_type = 'text/plain'
+    format = 'txt'
+
+    def stream(self, rows):
+        yield f'{_("Shopping list")}\n\n'
+        for name, measurement_unit, total_amount in rows:
+            yield (
+                f'{name} ({measurement_unit or ""}) '
+                f'— {format_amount(total_amount)}\n'
+            )
+
+
+class ShoppingListPDFRenderer(ShoppingListRenderer):
+    """
+    Draws the list page by page as the rows arrive.
+    A PDF ends with the cross-reference table of its objects,
+    so the file is sent once the last page is drawn.
+    """
+    media_type = 'application/pdf'
+    format = 'pdf'
+    charset = None
+
+    def get_font(self):
+        if PDF_FONT_NAME in pdfmetrics.getRegisteredFontNames():
+            return PDF_FONT_NAME
+        if os.path.exists(PDF_FONT_PATH):
+            pdfmetrics.registerFont(TTFont(PDF_FONT_NAME, PDF_FONT_PATH))
+            return PDF_FONT_NAME
+        return PDF_FALLBACK_FONT_NAME
+
+    def stream(self, rows):
+        font = self.get_font()
+        width, height = A4
+        with SpooledTemporaryFile(max_size=PDF_MAX_MEMORY_SIZE) as buffer:
+            canvas = Canvas(buffer, pagesize=A4)
+            canvas.setTitle(_('Shopping list'))
+            canvas.setFont(font, PDF_TITLE_FONT_SIZE)
+            canvas.drawString(PDF_MARGIN, height - PDF_MARGIN,
+                              _('Shopping list'))
+            y = height - PDF_MARGIN - 2 * PDF_LINE_HEIGHT
+            canvas.setFont(font, PDF_FONT_SIZE)
+            for name, measurement_unit, total_amount in rows:
+                if y < PDF_MARGIN:
+                    canvas.showPage()
+                    canvas.setFont(font, PDF_FONT_SIZE)
+                    y = height - PDF_MARGIN
+                canvas.drawString(PDF_MARGIN, y, name)
+                canvas.drawRightString(
+                    width - PDF_MARGIN, y,
+                    f'{format_amount(total_amount)} {measurement_unit or ""}'
+                )
+                y -= PDF_LINE_HEIGHT
+            canvas.save()
+            buffer.seek(0)
+            yield from iter(lambda: buffer.read(PDF_CHUNK_SIZE), b'')
+
+
+SHOPPING_LIST_RENDERERS = (
+    ShoppingListCSVRenderer,
+    ShoppingListTextRenderer,
+    ShoppingListPDFRenderer,
+)
@@ -0,0 +1,254 @@
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_delete, pre_save)
+from django.dispatch import receiver
+from tasks.queue import enqueue
+from users.models import Subscription, User
+
+from recipes.cache import invalidate_all_recipes, invalidate_recipes
+from recipes.conditional import (COUNTERS_VERSION, INGREDIENTS_VERSION,
+                                 RECIPES_VERSION, TAGS_VERSION,
+                                 bump_user_version, bump_version_on_commit,
+                                 touch_recipes)
+from recipes.counters import (increment_favorites_count,
+                              increment_user_counter)
+from recipes.images import has_renditions
+from recipes.models import (Favorites, Ingredient, MeasurementUnit, Recipe,
+                            RecipeIngredient, RecipeTag, ShoppingCart, Tag)
+from recipes.pagination import reset_cached_counts
+from recipes.search import (invalidate_ingredient_index,
+                            invalidate_recipe_index, invalidate_tag_index,
+                            update_search_vectors, update_tags_masks)
+from recipes.shopping_list import (apply_shopping_list_deltas,
+                                   get_recipe_amounts)
+from recipes.tasks import create_image_renditions, release_image
+
+# User fields rendered in the author block of cached recipes.
+AUTHOR_FIELDS = {'username', 'first_name', 'last_name', 'email'}
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+@receiver(post_save, sender=RecipeTag)
+@receiver(post_delete, sender=RecipeTag)
+@receiver(post_save, sender=Favorites)
+@receiver(post_delete, sender=Favorites)
+@receiver(post_save, sender=ShoppingCart)
+@receiver(post_delete, sender=ShoppingCart)
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+@receiver(post_save, sender=Subscription)
+@receiver(post_delete, sender=Subscription)
+def reset_list_counts(sender, **kwargs):
+    """
+    Any write to a paginated list resets the cached counts.
+    """
+    reset_cached_counts()
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+def invalidate_recipe(sender, instance, **kwargs):
+    invalidate_recipes([instance.id])
+    bump_version_on_commit(RECIPES_VERSION)
+
+
+@receiver(post_save, sender=Recipe)
+def update_recipe_search_vector(sender, instance, update_fields, **kwargs):
+    if update_fields is None or {'name', 'text'} & set(update_fields):
+        update_search_vectors([instance.id])
+
+
+@receiver(post_save, sender=Recipe)
+def create_recipe_image_renditions(sender, instance, update_fields,
+                                   **kwargs):
+    if not instance.image:
+        return
+    if update_fields is not None and 'image' not in update_fields:
+        return
+    if not has_renditions(instance.image.name):
+        enqueue(
+            create_image_renditions, instance.image.name,
+            key=f'renditions:{instance.image.name}'
+        )
+
+
+@receiver(pre_save, sender=Recipe)
+def remember_recipe_image(sender, instance, update_fields, **kwargs):
+    if instance._state.adding:
+        return
+    if update_fields is not None and 'image' not in update_fields:
+        return
+    instance.previous_image = Recipe.objects.filter(
+        pk=instance.pk
+    ).values_list('image', flat=True).first()
+
+
+@receiver(post_save, sender=Recipe)
+def release_replaced_image(sender, instance, **kwargs):
+    previous = getattr(instance, 'previous_image', None)
+    if previous and previous != instance.image.name:
+        enqueue(release_image, previous)
+    instance.previous_image = None
+
+
+@receiver(post_delete, sender=Recipe)
+def release_deleted_image(sender, instance, **kwargs):
+    if instance.image:
+        enqueue(release_image, instance.image.name)
+
+
+@receiver(post_delete, sender=Recipe)
+def remove_recipe_from_search(sender, **kwargs):
+    invalidate_recipe_index()
+
+
+@receiver(post_save, sender=RecipeIngredient)
+@receiver(post_delete, sender=RecipeIngredient)
+@receiver(post_save, sender=RecipeTag)
+@receiver(post_delete, sender=RecipeTag)
+def invalidate_recipe_relation(sender, instance, **kwargs):
+    invalidate_recipes([instance.recipe_id])
+    touch_recipes([instance.recipe_id])
+
+
+@receiver(post_save, sender=RecipeTag)
+@receiver(post_delete, sender=RecipeTag)
+def update_recipe_tags_mask(sender, instance, **kwargs):
+    update_tags_masks([instance.recipe_id])
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def update_recipe_tags_mask_m2m(sender, instance, action, reverse, pk_set,
+                                **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        update_tags_masks([instance.id])
+    elif pk_set:
+        update_tags_masks(pk_set)
+    else:
+        update_tags_masks(Recipe.objects.values_list('id', flat=True))
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def invalidate_recipe_m2m(sender, instance, action, reverse, pk_set,
+                          **kwargs):
+    if not action.startswith('post_'):
+        return
+    if not reverse:
+        invalidate_recipes([instance.id])
+        touch_recipes([instance.id])
+    elif pk_set:
+        invalidate_recipes(pk_set)
+        touch_recipes(pk_set)
+    else:
+        invalidate_all_recipes()
+        bump_version_on_commit(RECIPES_VERSION)
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+@receiver(post_save, sender=MeasurementUnit)
+@receiver(post_delete, sender=MeasurementUnit)
+def invalidate_catalogue(sender, **kwargs):
+    """
+    Tags and ingredients are shared by many recipes and rarely change,
+    so any change drops all cached recipes.
+    """
+    invalidate_all_recipes()
+    if sender is Tag:
+        bump_version_on_commit(TAGS_VERSION)
+        invalidate_tag_index()
+    else:
+        bump_version_on_commit(INGREDIENTS_VERSION)
+        invalidate_ingredient_index()
+
+
+@receiver(post_save, sender=User)
+def invalidate_author_recipes(sender, instance, update_fields, **kwargs):
+    """
+    Recipes embed their author, so they are invalidated when a field
+    shown in the author block changes, e.g. not on a last_login update.
+    """
+    if update_fields is not None and not (
+        AUTHOR_FIELDS & set(update_fields)
+    ):
+        return
+    recipe_ids = list(instance.recipes.values_list('id', flat=True))
+    if recipe_ids:
+        invalidate_recipes(recipe_ids)
+        touch_recipes(recipe_ids)
+
+
+@receiver(post_save, sender=Favorites)
+@receiver(post_delete, sender=Favorites)
+@receiver(post_save, sender=ShoppingCart)
+@receiver(post_delete, sender=ShoppingCart)
+def bump_user_marks(sender, instance, **kwargs):
+    bump_user_version(instance.user_id)
+
+
+@receiver(post_save, sender=Subscription)
+@receiver(post_delete, sender=Subscription)
+def bump_follower_marks(sender, instance, **kwargs):
+    bump_user_version(instance.follower_id)
+
+
+@receiver(post_save, sender=Recipe)
+def count_created_recipe(sender, instance, created, **kwargs):
+    if created:
+        increment_user_counter(instance.author_id, 'recipes_count')
+
+
+@receiver(post_delete, sender=Recipe)
+def count_deleted_recipe(sender, instance, **kwargs):
+    increment_user_counter(instance.author_id, 'recipes_count', -1)
+
+
+@receiver(post_save, sender=Favorites)
+def count_created_favorite(sender, instance, created, **kwargs):
+    if created:
+        increment_favorites_count(instance.recipe_id)
+        bump_version_on_commit(COUNTERS_VERSION)
+
+
+@receiver(post_delete, sender=Favorites)
+def count_deleted_favorite(sender, instance, **kwargs):
+    increment_favorites_count(instance.recipe_id, -1)
+    bump_version_on_commit(COUNTERS_VERSION)
+
+
+@receiver(post_save, sender=Subscription)
+def count_created_subscription(sender, instance, created, **kwargs):
+    if created:
+        increment_user_counter(instance.following_id, 'followers_count')
+        bump_version_on_commit(COUNTERS_VERSION)
+
+
+@receiver(post_delete, sender=Subscription)
+def count_deleted_subscription(sender, instance, **kwargs):
+    increment_user_counter(instance.following_id, 'followers_count', -1)
+    bump_version_on_commit(COUNTERS_VERSION)
+
+
+@receiver(post_save, sender=ShoppingCart)
+def add_to_shopping_list(sender, instance, created, **kwargs):
+    if created:
+        apply_shopping_list_deltas(
+            [instance.user_id], get_recipe_amounts(instance.recipe_id)
+        )
+
+
+@receiver(pre_delete, sender=ShoppingCart)
+def remove_from_shopping_list(sender, instance, **kwargs):
+    """
+    Runs before the deletion, so the recipe's ingredients are still
+    there when the cart row goes away together with the recipe.
+    """
+    apply_shopping_list_deltas([instance.user_id], {
+        key: -amount
+        for key, amount in get_recipe_amounts(instance.recipe_id).items()
+    })
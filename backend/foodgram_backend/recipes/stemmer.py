@@ -0,0 +1,130 @@
+"""
+Russian stemmer, a port of the Snowball algorithm
+(https://snowballstem.org/algorithms/russian/stemmer.html).
+Used by the in-process recipe search index, PostgreSQL uses
+its own 'russian' text search configuration.
+"""
+
+VOWELS = 'аеиоуыэюя'
+
+PERFECTIVE_GERUND = (
+    ('в', 'вши', 'вшись'),
+    ('ив', 'ивши', 'ившись', 'ыв', 'ывши', 'ывшись'),
+)
+ADJECTIVE = (
+    (),
+    ('ее', 'ие', 'ые', 'ое', 'ими', 'ыми', 'ей', 'ий', 'ый', 'ой', 'ем',
+     'им', 'ым', 'ом', 'его', 'ого', 'ему', 'ому', 'их', 'ых', 'ую', 'юю',
+     'ая', 'яя', 'ою', 'ею'),
+)
+PARTICIPLE = (
+    ('ем', 'нн', 'вш', 'ющ', 'щ'),
+    ('ивш', 'ывш', 'ующ'),
+)
+REFLEXIVE = ((), ('ся', 'сь'))
+VERB = (
+    ('ла', 'на', 'ете', 'йте', 'ли', 'й', 'л', 'ем', 'н', 'ло', 'но', 'ет',
+     'ют', 'ны', 'ть', 'ешь', 'нно'),
+    ('ила', 'ыла', 'ена', 'ейте', 'уйте', 'ите', 'или', 'ыли', 'ей', 'уй',
+     'ил', 'ыл', 'им', 'ым', 'ен', 'ило', 'ыло', 'ено', 'ят', 'ует', 'уют',
+     'ит', 'ыт', 'ены', 'ить', 'ыть', 'ишь', 'ую', 'ю'),
+)
+NOUN = (
+    (),
+    ('а', 'ев', 'ов', 'ие', 'ье', 'е', 'иями', 'ями', 'ами', 'еи', 'ии',
+     'и', 'ией', 'ей', 'ой', 'ий', 'й', 'иям', 'ям', 'ием', 'ем', 'ам',
+     'ом', 'о', 'у', 'ах', 'иях', 'ях', 'ы', 'ь', 'ию', 'ью', 'ю', 'ия',
+     'ья', 'я'),
+)
+SUPERLATIVE = ('ейше', 'ейш')
+DERIVATIONAL = ('ость', 'ост')
+
+
+def find_region(word, start=0):
+    """
+    Position after the first non-vowel that follows a vowel.
+    """
+    for i in range(start + 1, len(word)):
+        if word[i] not in VOWELS and word[i - 1] in VOWELS:
+            return i + 1
+    return len(word)
+
+
+def strip_ending(rv, groups):
+    """
+    Remove the longest ending of the groups from rv.
+    Endings of the first group must follow 'а' or 'я'.
+    Returns the shortened rv or None.
+    """
+    found = None
+    for group, endings in enumerate(groups):
+        for ending in endings:
+            if not rv.endswith(ending):
+                continue
+            if group == 0 and rv[:-len(ending)][-1:] not in ('а', 'я'):
+                continue
+            if found is None or len(ending) > len(found):
+                found = ending
+    if found is None:
+        return None
+    return rv[:-len(found)]
+
+
+def strip_adjectival(rv):
+    stripped = strip_ending(rv, ADJECTIVE)
+    if stripped is None:
+        return None
+    participle = strip_ending(stripped, PARTICIPLE)
+    return stripped if participle is None else participle
+
+
+def stem(word):
+    word = word.lower().replace('ё', 'е')
+    rv_start = next(
+        (i + 1 for i, char in enumerate(word) if char in VOWELS), len(word)
+    )
+    r2_start = find_region(word, find_region(word))
+    prefix, rv = word[:rv_start], word[rv_start:]
+
+    # Step 1
+    stripped = strip_ending(rv, PERFECTIVE_GERUND)
+    if stripped is None:
+        reflexive = strip_ending(rv, REFLEXIVE)
+        if reflexive is not None:
+            rv = reflexive
+        for step in (
+            strip_adjectival,
+            lambda rv: strip_ending(rv, VERB),
+            lambda rv: strip_ending(rv, NOUN),
+        ):
+            stripped = step(rv)
+            if stripped is not None:
+                break
+    if stripped is not None:
+        rv = stripped
+
+    # Step 2
+    if rv.endswith('и'):
+        rv = rv[:-1]
+
+    # Step 3
+    r2 = rv[max(r2_start - rv_start, 0):]
+    for ending in DERIVATIONAL:
+        if r2.endswith(ending):
+            rv = rv[:-len(ending)]
+            break
+
+    # Step 4
+    if rv.endswith('нн'):
+        rv = rv[:-1]
+    else:
+        for ending in SUPERLATIVE:
+            if rv.endswith(ending):
+                rv = rv[:-len(ending)]
+                if rv.endswith('нн'):
+                    rv = rv[:-1]
+                break
+        else:
+            if rv.endswith('ь'):
+                rv = rv[:-1]
+    return prefix + rv
@@ -0,0 +1,42 @@
+import hashlib
+import os
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    Names files by the SHA-256 of their content, keeping the directory
+    and the extension, so the same bytes are stored once and a name
+    never changes its content. An existing file is reused as is.
+    """
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        name = self.get_content_name(name, content)
+        try:
+            return super().save(name, content, max_length=max_length)
+        except FileExistsError:
+            # A reused file counts as just uploaded, so that
+            # release_image does not delete it under the new recipe.
+            os.utime(self.path(name))
+            return name
+
+    def get_content_name(self, name, content):
+        digest = hashlib.sha256()
+        for chunk in content.chunks():
+            digest.update(chunk)
+        directory = os.path.dirname(name)
+        extension = os.path.splitext(name)[1].lower()
+        return os.path.join(directory, digest.hexdigest() + extension)
+
+    def get_available_name(self, name, max_length=None):
+        # Raised from _save() too, when a concurrent request
+        # has written the same content first.
+        if self.exists(name):
+            raise FileExistsError(name)
+        return name
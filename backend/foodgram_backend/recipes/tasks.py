@@ -0,0 +1,49 @@
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from tasks.queue import task
+
+from recipes import counters, images, shopping_list
+from recipes.cache import invalidate_recipes
+from recipes.conditional import touch_recipes
+from recipes.models import Recipe
+
+# Image renditions and releases, the shopping list rebuilds after
+# a recipe edit and the periodic maintenance run in the worker.
+# Ingredient imports stay in the request, as their response reports
+# the result of every row; so do the cascades of a recipe deletion,
+# whose cart rows update the shopping lists in the same transaction.
+# The users app has no work slow enough to move.
+
+
+@task()
+def create_image_renditions(name):
+    # The image may have been replaced and deleted before the task ran.
+    if default_storage.exists(name) and not images.has_renditions(name):
+        images.create_renditions(name)
+        # The recipes were cached with the original image's URLs.
+        recipe_ids = list(
+            Recipe.objects.filter(image=name).values_list('id', flat=True)
+        )
+        if recipe_ids:
+            invalidate_recipes(recipe_ids)
+            touch_recipes(recipe_ids)
+
+
+@task()
+def release_image(name):
+    images.release_image(name)
+
+
+@task()
+def rebuild_shopping_lists(user_ids):
+    shopping_list.rebuild_shopping_lists(user_ids)
+
+
+@task()
+def reconcile_counters():
+    counters.reconcile_counters()
+
+
+@task()
+def collect_images():
+    call_command('collect_images')
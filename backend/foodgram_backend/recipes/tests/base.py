@@ -0,0 +1,94 @@
+import shutil
+import tempfile
+
+from django.core.cache import cache
+from django.test import override_settings
+from rest_framework.test import APIClient, APITestCase
+from tasks.queue import claim_task, run_task
+from users.models import User
+
+from recipes.models import Ingredient, MeasurementUnit, Recipe, Tag
+
+IMAGE = (
+    'data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAAEAAAABAQMAAAAl21bKAAAAA1'
+    'BMVEUAAACnej3aAAAAAXRSTlMAQObYZgAAAApJREFUCNdjYAAAAAIAAeIhvDMAAAAASUVORK'
+    '5CYII='
+)
+
+
+class RecipeAPITestCase(APITestCase):
+    """
+    Two users, a small catalogue and helpers creating recipes
+    through the API, so the signals and caches run as in production.
+    """
+
+    def setUp(self):
+        cache.clear()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        media = override_settings(MEDIA_ROOT=media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+        self.author = User.objects.create_user(
+            email='author@example.com', username='author', password='pass',
+            first_name='Author', last_name='Author'
+        )
+        self.reader = User.objects.create_user(
+            email='reader@example.com', username='reader', password='pass',
+            first_name='Reader', last_name='Reader'
+        )
+        self.unit = MeasurementUnit.objects.create(name='г')
+        self.ingredients = [
+            Ingredient.objects.create(
+                name=f'ингредиент {number}', measurement_unit=self.unit
+            )
+            for number in range(4)
+        ]
+        self.tags = [
+            Tag.objects.create(
+                name=f'tag {number}', slug=f'tag{number}', color='#aabbcc'
+            )
+            for number in range(2)
+        ]
+        self.author_client = self.client_for(self.author)
+        self.reader_client = self.client_for(self.reader)
+
+    def client_for(self, user):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client
+
+    def recipe_data(self, amounts=None, **fields):
+        amounts = amounts or {0: 100, 1: 2}
+        data = {
+            'name': 'Recipe',
+            'text': 'Text',
+            'cooking_time': 10,
+            'image': IMAGE,
+            'tags': [self.tags[0].id],
+            'ingredients': [
+                {'id': self.ingredients[index].id, 'amount': amount}
+                for index, amount in amounts.items()
+            ],
+        }
+        data.update(fields)
+        return data
+
+    def create_recipe(self, **fields):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.author_client.post(
+                '/api/recipes/', self.recipe_data(**fields), format='json'
+            )
+        self.assertEqual(response.status_code, 201, response.content)
+        return Recipe.objects.get(id=response.data['id'])
+
+    def run_tasks(self):
+        """
+        Run the queued tasks as the worker would.
+        """
+        while True:
+            claimed = claim_task('test')
+            if claimed is None:
+                break
+            with self.captureOnCommitCallbacks(execute=True):
+                self.assertTrue(run_task(claimed))
@@ -0,0 +1,67 @@
+from django.core.cache import cache
+from django.test import SimpleTestCase
+
+from recipes.cache import (bump_cache_version, get_cache_version,
+                           get_recipe_fragments, invalidate_recipes)
+from recipes.models import Recipe
+from recipes.tests.base import RecipeAPITestCase
+
+
+class CacheVersionTests(SimpleTestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def test_bump_changes_version(self):
+        version = get_cache_version('test_version')
+        bump_cache_version('test_version')
+        self.assertNotEqual(get_cache_version('test_version'), version)
+
+    def test_evicted_version_does_not_repeat(self):
+        bump_cache_version('test_version')
+        version = get_cache_version('test_version')
+        cache.delete('test_version')
+        bump_cache_version('test_version')
+        self.assertGreater(get_cache_version('test_version'), version)
+
+
+class RecipeFragmentInvalidationTests(RecipeAPITestCase):
+
+    def test_fragment_is_dropped_after_commit(self):
+        recipe = self.create_recipe()
+        self.reader_client.get(f'/api/recipes/{recipe.id}/')
+        self.assertIn(recipe.id, get_recipe_fragments([recipe.id]))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            invalidate_recipes([recipe.id])
+            # A concurrent request still reads the committed data.
+            self.assertIn(recipe.id, get_recipe_fragments([recipe.id]))
+        self.assertNotIn(recipe.id, get_recipe_fragments([recipe.id]))
+
+    def test_update_returns_new_data(self):
+        recipe = self.create_recipe()
+        self.reader_client.get(f'/api/recipes/{recipe.id}/')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.author_client.patch(
+                f'/api/recipes/{recipe.id}/',
+                self.recipe_data(name='Updated'), format='json'
+            )
+        response = self.reader_client.get(f'/api/recipes/{recipe.id}/')
+        self.assertEqual(response.data['name'], 'Updated')
+
+    def test_login_does_not_touch_author_recipes(self):
+        recipe = self.create_recipe()
+        updated_at = recipe.updated_at
+        self.author.save(update_fields=['last_login'])
+        self.assertEqual(
+            Recipe.objects.get(id=recipe.id).updated_at, updated_at
+        )
+
+    def test_author_name_change_touches_recipes(self):
+        recipe = self.create_recipe()
+        updated_at = recipe.updated_at
+        self.author.first_name = 'Renamed'
+        self.author.save()
+        self.assertGreater(
+            Recipe.objects.get(id=recipe.id).updated_at, updated_at
+        )
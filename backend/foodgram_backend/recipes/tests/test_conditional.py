@@ -0,0 +1,123 @@
+from recipes.conditional import (COUNTERS_VERSION, RECIPES_VERSION,
+                                 USER_VERSION, touch_recipes)
+from recipes.models import Favorites, Recipe
+from recipes.tests.base import RecipeAPITestCase
+
+
+class ConditionalGetTests(RecipeAPITestCase):
+
+    def get(self, client, url, etag=None):
+        headers = {'HTTP_IF_NONE_MATCH': etag} if etag else {}
+        return client.get(url, **headers)
+
+    def favorite(self, recipe):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.reader_client.post(
+                f'/api/recipes/{recipe.id}/favorite/'
+            )
+        self.assertEqual(response.status_code, 201, response.content)
+
+    def test_unchanged_recipe_is_not_modified(self):
+        recipe = self.create_recipe()
+        for url in ('/api/recipes/', f'/api/recipes/{recipe.id}/'):
+            with self.subTest(url=url):
+                etag = self.get(self.author_client, url)['ETag']
+                response = self.get(self.author_client, url, etag)
+                self.assertEqual(response.status_code, 304)
+
+    def test_recipe_edit_changes_etag(self):
+        recipe = self.create_recipe()
+        url = f'/api/recipes/{recipe.id}/'
+        etag = self.get(self.reader_client, url)['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.author_client.patch(
+                url, self.recipe_data(name='Updated'), format='json'
+            )
+        response = self.get(self.reader_client, url, etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['name'], 'Updated')
+
+    def test_favorite_by_another_user_changes_etag(self):
+        recipe = self.create_recipe()
+        for url in ('/api/recipes/', f'/api/recipes/{recipe.id}/'):
+            with self.subTest(url=url):
+                etag = self.get(self.author_client, url)['ETag']
+                self.favorite(recipe)
+                response = self.get(self.author_client, url, etag)
+                self.assertEqual(response.status_code, 200)
+                with self.captureOnCommitCallbacks(execute=True):
+                    self.reader_client.delete(
+                        f'/api/recipes/{recipe.id}/favorite/'
+                    )
+
+    def test_favorites_count_is_current(self):
+        recipe = self.create_recipe()
+        url = f'/api/recipes/{recipe.id}/'
+        etag = self.get(self.author_client, url)['ETag']
+        self.favorite(recipe)
+        response = self.get(self.author_client, url, etag)
+        self.assertEqual(response.data['favorites_count'], 1)
+
+    def test_subscription_changes_etag(self):
+        recipe = self.create_recipe()
+        url = f'/api/recipes/{recipe.id}/'
+        etag = self.get(self.author_client, url)['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.reader_client.post(
+                f'/api/users/{self.author.id}/subscribe/'
+            )
+        self.assertEqual(response.status_code, 201, response.content)
+        response = self.get(self.author_client, url, etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['author']['followers_count'], 1)
+
+    def test_save_keeps_derived_columns(self):
+        recipe = self.create_recipe()
+        stale = Recipe.objects.get(id=recipe.id)
+        self.favorite(recipe)
+        recipe.tags.add(self.tags[1])
+        stale.name = 'Renamed'
+        stale.save()
+        recipe = Recipe.objects.get(id=recipe.id)
+        self.assertEqual(recipe.name, 'Renamed')
+        self.assertEqual(recipe.favorites_count, 1)
+        self.assertEqual(
+            recipe.tags_mask,
+            1 << self.tags[0].bit | 1 << self.tags[1].bit
+        )
+
+    def test_ingredient_autocomplete_needs_no_query(self):
+        url = '/api/ingredients/?name=инг'
+        etag = self.get(self.reader_client, url)['ETag']
+        with self.assertNumQueries(0):
+            response = self.get(self.reader_client, url)
+        self.assertEqual(response['ETag'], etag)
+        with self.assertNumQueries(0):
+            response = self.get(self.reader_client, url, etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_ingredient_change_changes_autocomplete_etag(self):
+        url = '/api/ingredients/'
+        etag = self.get(self.reader_client, url)['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.ingredients[0].name = 'Соль'
+            self.ingredients[0].save()
+        response = self.get(self.reader_client, url, etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_version_is_bumped_once_per_transaction(self):
+        recipe = self.create_recipe()
+        with self.captureOnCommitCallbacks() as callbacks:
+            for user in (self.author, self.reader):
+                Favorites.objects.create(user=user, recipe=recipe)
+            touch_recipes([recipe.id])
+            touch_recipes([recipe.id])
+        self.assertEqual(
+            sorted(callback.pending_version for callback in callbacks
+                   if hasattr(callback, 'pending_version')),
+            sorted([
+                COUNTERS_VERSION, RECIPES_VERSION,
+                USER_VERSION.format(user_id=self.author.id),
+                USER_VERSION.format(user_id=self.reader.id),
+            ])
+        )
@@ -0,0 +1,82 @@
+from unittest import mock
+
+from recipes.counters import reconcile_counters
+from recipes.models import Favorites, FavoritesCounterShard, Recipe
+from recipes.tests.base import RecipeAPITestCase
+from users.models import Subscription, User
+
+
+class CounterTests(RecipeAPITestCase):
+
+    def test_signals_keep_counters(self):
+        recipe = self.create_recipe()
+        Favorites.objects.create(user=self.reader, recipe=recipe)
+        Subscription.objects.create(
+            follower=self.reader, following=self.author
+        )
+        self.assertEqual(
+            Recipe.objects.get(id=recipe.id).favorites_count, 1
+        )
+        author = User.objects.get(id=self.author.id)
+        self.assertEqual(author.recipes_count, 1)
+        self.assertEqual(author.followers_count, 1)
+
+        Favorites.objects.all().delete()
+        self.assertEqual(
+            Recipe.objects.get(id=recipe.id).favorites_count, 0
+        )
+
+    def test_counter_never_goes_below_zero(self):
+        recipe = self.create_recipe()
+        Favorites.objects.create(user=self.reader, recipe=recipe)
+        Recipe.objects.update(favorites_count=0)
+        Favorites.objects.all().delete()
+        self.assertEqual(
+            Recipe.objects.get(id=recipe.id).favorites_count, 0
+        )
+
+    def test_reconcile_repairs_drifted_counters(self):
+        recipe = self.create_recipe()
+        with self.captureOnCommitCallbacks(execute=True):
+            Favorites.objects.create(user=self.reader, recipe=recipe)
+            Subscription.objects.create(
+                follower=self.reader, following=self.author
+            )
+        Recipe.objects.update(favorites_count=7)
+        User.objects.update(recipes_count=5, followers_count=3)
+
+        url = f'/api/recipes/{recipe.id}/'
+        etag = self.author_client.get(url)['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            reconcile_counters()
+
+        self.assertEqual(
+            Recipe.objects.get(id=recipe.id).favorites_count, 1
+        )
+        author = User.objects.get(id=self.author.id)
+        self.assertEqual(author.recipes_count, 1)
+        self.assertEqual(author.followers_count, 1)
+        reader = User.objects.get(id=self.reader.id)
+        self.assertEqual(reader.recipes_count, 0)
+        self.assertEqual(reader.followers_count, 0)
+        response = self.author_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['favorites_count'], 1)
+
+    @mock.patch('recipes.counters.FAVORITES_COUNTER_SHARDS', 8)
+    def test_sharded_counter_returns_to_zero(self):
+        recipe = self.create_recipe()
+        url = f'/api/recipes/{recipe.id}/'
+        for _ in range(20):
+            Favorites.objects.create(user=self.reader, recipe=recipe)
+            self.assertEqual(
+                self.author_client.get(url).data['favorites_count'], 1
+            )
+            Favorites.objects.all().delete()
+            self.assertEqual(
+                self.author_client.get(url).data['favorites_count'], 0
+            )
+        self.assertEqual(Recipe.objects.get(id=recipe.id).favorites_count, 0)
+        self.assertFalse(
+            FavoritesCounterShard.objects.filter(count__gt=0).exists()
+        )
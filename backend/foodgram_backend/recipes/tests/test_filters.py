@@ -0,0 +1,53 @@
+from recipes.models import Favorites, Recipe
+from recipes.tests.base import RecipeAPITestCase
+
+
+class FavoritedAtOrderingTests(RecipeAPITestCase):
+
+    def test_recipes_not_in_favorites_come_last(self):
+        first, second, other = [
+            self.create_recipe(name=f'Recipe {number}')
+            for number in range(3)
+        ]
+        Favorites.objects.create(user=self.reader, recipe=first)
+        Favorites.objects.create(user=self.reader, recipe=second)
+        for ordering, expected in (
+            ('favorited_at', [first.id, second.id, other.id]),
+            ('-favorited_at', [second.id, first.id, other.id]),
+        ):
+            with self.subTest(ordering=ordering):
+                response = self.reader_client.get(
+                    f'/api/recipes/?ordering={ordering}'
+                )
+                self.assertEqual(
+                    [recipe['id'] for recipe in response.data['results']],
+                    expected
+                )
+
+
+class TagsFilterTests(RecipeAPITestCase):
+
+    def get_ids(self, query):
+        response = self.reader_client.get(f'/api/recipes/?{query}')
+        return {recipe['id'] for recipe in response.data['results']}
+
+    def test_recipes_with_any_of_the_tags(self):
+        first = self.create_recipe()
+        second = self.create_recipe(tags=[tag.id for tag in self.tags])
+        self.assertEqual(
+            set(Recipe.objects.values_list('tags_mask', flat=True)),
+            {1 << self.tags[0].bit,
+             1 << self.tags[0].bit | 1 << self.tags[1].bit}
+        )
+        self.assertEqual(self.get_ids('tags=tag0'), {first.id, second.id})
+        self.assertEqual(self.get_ids('tags=tag1'), {second.id})
+        self.assertEqual(self.get_ids('tags=unknown'), set())
+
+    def test_masks_follow_tag_changes(self):
+        recipe = self.create_recipe()
+        recipe.tags.set([self.tags[1]])
+        self.assertEqual(self.get_ids('tags=tag0'), set())
+        self.assertEqual(self.get_ids('tags=tag1'), {recipe.id})
+        self.tags[1].tags.clear()
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.tags_mask, 0)
@@ -0,0 +1,48 @@
+import os
+import time
+
+from recipes.images import release_image
+from recipes.tests.base import RecipeAPITestCase
+
+
+class RecipeImageRenditionTests(RecipeAPITestCase):
+
+    def test_original_image_is_served_until_renditions_exist(self):
+        recipe = self.create_recipe()
+        url = f'/api/recipes/{recipe.id}/'
+        response = self.reader_client.get(url)
+        image = response.data['image']
+        for formats in response.data['image_renditions'].values():
+            self.assertEqual(set(formats.values()), {image})
+
+        self.run_tasks()
+        fresh = self.reader_client.get(
+            url, HTTP_IF_NONE_MATCH=response['ETag']
+        )
+        self.assertEqual(fresh.status_code, 200)
+        for formats in fresh.data['image_renditions'].values():
+            for rendition_url in formats.values():
+                self.assertIn('/renditions/', rendition_url)
+
+    def test_released_image_is_kept_for_grace_period(self):
+        recipe = self.create_recipe()
+        name = recipe.image.name
+        path = recipe.image.path
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe.delete()
+        self.run_tasks()
+        self.assertTrue(os.path.exists(path))
+
+        # Another upload of the same content renews the file.
+        old = time.time() - 24 * 60 * 60
+        os.utime(path, (old, old))
+        other = self.create_recipe()
+        self.assertEqual(other.image.name, name)
+        with self.captureOnCommitCallbacks(execute=True):
+            other.delete()
+        self.run_tasks()
+        self.assertTrue(os.path.exists(path))
+
+        os.utime(path, (old, old))
+        release_image(name)
+        self.assertFalse(os.path.exists(path))
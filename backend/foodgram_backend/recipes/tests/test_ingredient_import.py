@@ -0,0 +1,124 @@
+from functools import partial
+from unittest import mock
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import IntegrityError, transaction
+
+from recipes.ingredient_import import IngredientImporter
+from recipes.models import Ingredient
+from recipes.tests.base import RecipeAPITestCase
+
+
+class IngredientImportTests(RecipeAPITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.author.is_staff = True
+        self.author.save()
+
+    def import_data(self, data):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.author_client.post(
+                '/api/import/ingredients/', {'data': data}, format='json'
+            )
+        self.assertEqual(response.status_code, 201, response.content)
+        return response.data
+
+    def test_response_lists_ids_of_every_row(self):
+        data = [
+            {'name': 'соль', 'measurement_unit': 'г'},
+            {'name': 'сахар', 'measurement_unit': 'кг'},
+            {'name': 'соль', 'measurement_unit': 'г'},
+            {'name': '', 'measurement_unit': 'г'},
+        ]
+        result = self.import_data(data)
+        salt = Ingredient.objects.get(name='соль')
+        sugar = Ingredient.objects.get(name='сахар')
+        self.assertEqual(result['ids'], [salt.id, sugar.id, salt.id])
+        self.assertEqual(result['created'], 2)
+        self.assertEqual(result['existing'], 1)
+        self.assertEqual(result['errors'][0]['row'], 4)
+
+        again = self.import_data(data)
+        self.assertEqual(again['ids'], result['ids'])
+        self.assertEqual(again['created'], 0)
+        self.assertEqual(Ingredient.objects.filter(name='соль').count(), 1)
+
+    def test_existing_ingredient_is_reused(self):
+        result = self.import_data([
+            {'name': self.ingredients[0].name, 'measurement_unit': 'г'}
+        ])
+        self.assertEqual(result['ids'], [self.ingredients[0].id])
+
+    def test_concurrently_inserted_ingredient_is_skipped(self):
+        importer = IngredientImporter(collect_ids=True)
+        get_ids = importer.get_ids
+
+        def insert_concurrently(keys):
+            # Another import inserts the row after this one has found
+            # no existing ingredients.
+            importer.get_ids = get_ids
+            Ingredient.objects.create(
+                name='перец', measurement_unit=self.unit
+            )
+            return {}
+
+        importer.get_ids = insert_concurrently
+        importer.run([(1, {'name': 'перец', 'measurement_unit': 'г'})])
+        pepper = Ingredient.objects.get(name='перец')
+        self.assertEqual(importer.ids, [pepper.id])
+
+    def test_repeated_rows_are_counted_once(self):
+        rows = [
+            (line, {'name': name, 'measurement_unit': 'г'})
+            for line, name in enumerate(['соль', 'перец', 'соль'], 1)
+        ]
+        importer = IngredientImporter(chunk_size=1).run(rows)
+        self.assertEqual((importer.created, importer.existing), (2, 1))
+        importer = IngredientImporter(chunk_size=2).run(rows)
+        self.assertEqual((importer.created, importer.existing), (0, 3))
+
+    def test_invalid_file_keeps_imported_chunks_visible(self):
+        etag = self.reader_client.get('/api/ingredients/')['ETag']
+        self.assertEqual(
+            self.reader_client.get('/api/ingredients/?name=соль').data, []
+        )
+        content = (
+            '{"name": "соль", "measurement_unit": "г"}\n'
+            '{"name": "перец", "measurement_unit": "г"}\n'
+            '{"name": "сахар", "measurement_unit": "г"}\n'
+            '{"name": '
+        ).encode()
+        upload = SimpleUploadedFile('ingredients.jsonl', content)
+        with mock.patch(
+            'recipes.views_import.IngredientImporter',
+            partial(IngredientImporter, chunk_size=2)
+        ), self.captureOnCommitCallbacks(execute=True):
+            response = self.author_client.post(
+                '/api/import/ingredients/', {'file': upload}
+            )
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(response.data['created'], 2)
+        self.assertIn('file_error', response.data)
+        self.assertEqual(
+            len(self.reader_client.get('/api/ingredients/?name=соль').data),
+            1
+        )
+        response = self.reader_client.get(
+            '/api/ingredients/', HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_invalid_first_chunk_is_rejected(self):
+        upload = SimpleUploadedFile('ingredients.jsonl', b'{"name": ')
+        response = self.author_client.post(
+            '/api/import/ingredients/', {'file': upload}
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Ingredient.objects.count(), len(self.ingredients))
+
+    def test_duplicate_ingredient_is_rejected(self):
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Ingredient.objects.create(
+                name=self.ingredients[0].name, measurement_unit=self.unit
+            )
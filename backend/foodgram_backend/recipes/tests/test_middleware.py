@@ -0,0 +1,62 @@
+import json
+from unittest import mock
+
+from recipes.tests.base import RecipeAPITestCase
+
+
+class InstrumentationMiddlewareTests(RecipeAPITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.reader.is_staff = True
+        self.reader.save()
+
+    def test_server_timing_is_sent_to_staff_only(self):
+        response = self.author_client.get('/api/users/')
+        self.assertNotIn('Server-Timing', response)
+        response = self.reader_client.get('/api/users/')
+        self.assertIn('serialize;dur=', response['Server-Timing'])
+
+    def test_server_timing_can_be_public(self):
+        with mock.patch('recipes.middleware.SERVER_TIMING_PUBLIC', True):
+            response = self.client.get('/api/tags/')
+        self.assertIn('Server-Timing', response)
+
+    def test_requests_are_sampled(self):
+        with mock.patch('recipes.middleware.REQUEST_LOG_SAMPLE_RATE', 0):
+            with self.assertNoLogs('recipes.middleware'):
+                self.reader_client.get('/api/tags/')
+        with mock.patch('recipes.middleware.REQUEST_LOG_SAMPLE_RATE', 1):
+            with self.assertLogs('recipes.middleware', 'INFO'):
+                self.reader_client.get('/api/tags/')
+
+    def test_slow_requests_are_always_logged(self):
+        with mock.patch('recipes.middleware.REQUEST_LOG_SAMPLE_RATE', 0), \
+                mock.patch('recipes.middleware.SLOW_REQUEST_THRESHOLD', 0):
+            with self.assertLogs('recipes.middleware', 'WARNING') as logs:
+                self.reader_client.get('/api/tags/')
+        record = json.loads(logs.records[0].getMessage())
+        self.assertTrue(record['slow'])
+
+    def test_streamed_queries_are_logged(self):
+        recipe = self.create_recipe()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.reader_client.post(
+                f'/api/recipes/{recipe.id}/shopping_cart/'
+            )
+        with mock.patch('recipes.middleware.REQUEST_LOG_SAMPLE_RATE', 1):
+            with self.assertLogs('recipes.middleware', 'INFO') as logs:
+                response = self.reader_client.get(
+                    '/api/recipes/download_shopping_cart/'
+                )
+                self.assertTrue(response.streaming)
+                self.assertIn('before streaming', response['Server-Timing'])
+                header_count = int(
+                    response['Server-Timing'].split('desc="')[1].split()[0]
+                )
+                content = b''.join(response.streaming_content)
+        self.assertTrue(content)
+        record = json.loads(logs.records[-1].getMessage())
+        self.assertIn('stream_ms', record)
+        self.assertEqual(record['size'], len(content))
+        self.assertGreater(record['sql_count'], header_count)
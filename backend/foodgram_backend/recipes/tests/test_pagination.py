@@ -0,0 +1,79 @@
+from datetime import timedelta
+
+from django.utils import timezone
+
+from recipes.models import Recipe
+from recipes.tests.base import RecipeAPITestCase
+
+
+class RecipeCursorPaginationTests(RecipeAPITestCase):
+
+    def setUp(self):
+        super().setUp()
+        now = timezone.now()
+        recipes = [
+            Recipe.objects.create(
+                author=self.author, name=f'Recipe {number}', text='Text',
+                cooking_time=10, image='recipe_images/recipe.png'
+            )
+            for number in range(7)
+        ]
+        # Pairs of recipes published at the same time are ordered by id.
+        for number, recipe in enumerate(recipes):
+            Recipe.objects.filter(id=recipe.id).update(
+                pub_date=now - timedelta(minutes=number // 2)
+            )
+        self.expected = list(Recipe.objects.order_by(
+            '-pub_date', '-id'
+        ).values_list('id', flat=True))
+
+    def get_page(self, url):
+        response = self.reader_client.get(url)
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.data
+
+    def get_ids(self, page):
+        return [recipe['id'] for recipe in page['results']]
+
+    def test_pages_cover_every_recipe_once(self):
+        for limit in (1, 2, 3, 7, 10):
+            with self.subTest(limit=limit):
+                page = self.get_page(f'/api/recipes/?cursor=&limit={limit}')
+                self.assertIsNone(page['previous'])
+                ids = self.get_ids(page)
+                while page['next']:
+                    page = self.get_page(page['next'])
+                    ids.extend(self.get_ids(page))
+                self.assertEqual(ids, self.expected)
+
+    def test_previous_pages_go_back_to_the_first(self):
+        pages = [self.get_page('/api/recipes/?cursor=&limit=3')]
+        while pages[-1]['next']:
+            pages.append(self.get_page(pages[-1]['next']))
+        self.assertEqual(len(pages), 3)
+        page = pages[-1]
+        for expected in reversed(pages[:-1]):
+            page = self.get_page(page['previous'])
+            self.assertEqual(self.get_ids(page), self.get_ids(expected))
+        self.assertEqual(self.get_ids(page), self.expected[:3])
+        self.assertIsNone(page['previous'])
+
+    def test_last_full_page_has_no_next(self):
+        page = self.get_page('/api/recipes/?cursor=&limit=7')
+        self.assertEqual(len(page['results']), 7)
+        self.assertIsNone(page['next'])
+
+    def test_invalid_cursor(self):
+        response = self.reader_client.get('/api/recipes/?cursor=broken')
+        self.assertEqual(response.status_code, 404)
+
+    def test_cursor_with_own_ordering_is_rejected(self):
+        for query in ('search=recipe', 'ordering=-favorited_at'):
+            with self.subTest(query=query):
+                response = self.reader_client.get(
+                    f'/api/recipes/?cursor=&{query}'
+                )
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('cursor', response.data)
+                response = self.reader_client.get(f'/api/recipes/?{query}')
+                self.assertEqual(response.status_code, 200)
@@ -0,0 +1,24 @@
+import io
+from unittest import mock
+
+from recipes.parsers import LimitedJSONParser, RequestBodyTooLarge
+from recipes.tests.base import RecipeAPITestCase
+
+
+@mock.patch('recipes.parsers.DATA_UPLOAD_MAX_MEMORY_SIZE', 100)
+class LimitedJSONParserTests(RecipeAPITestCase):
+
+    def test_large_json_body_is_rejected(self):
+        response = self.author_client.post(
+            '/api/recipes/', self.recipe_data(), format='json'
+        )
+        self.assertEqual(response.status_code, 413)
+
+    def test_body_without_length_is_limited(self):
+        parser = LimitedJSONParser()
+        self.assertEqual(
+            parser.parse(io.BytesIO(b'{"name": "Recipe"}')),
+            {'name': 'Recipe'}
+        )
+        with self.assertRaises(RequestBodyTooLarge):
+            parser.parse(io.BytesIO(b'[' + b'1,' * 100 + b'1]'))
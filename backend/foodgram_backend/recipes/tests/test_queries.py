@@ -0,0 +1,43 @@
+from users.models import Subscription, User
+
+from recipes.tests.base import RecipeAPITestCase
+
+
+class ListQueryCountTests(RecipeAPITestCase):
+    """
+    List pages take a fixed number of queries, whatever their size.
+    A warm request reuses the cached count and recipe fragments.
+    """
+
+    def setUp(self):
+        super().setUp()
+        other = User.objects.create_user(
+            email='other@example.com', username='other', password='pass',
+            first_name='Other', last_name='Other'
+        )
+        for number in range(3):
+            self.create_recipe(name=f'Recipe {number}')
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client_for(other).post(
+                '/api/recipes/', self.recipe_data(), format='json'
+            )
+            for following in (self.author, other):
+                Subscription.objects.create(
+                    follower=self.reader, following=following
+                )
+        self.assertEqual(response.status_code, 201, response.content)
+
+    def assertListQueries(self, url, cold, warm):
+        for queries in (cold, warm):
+            with self.assertNumQueries(queries):
+                response = self.reader_client.get(url)
+            self.assertEqual(response.status_code, 200)
+
+    def test_recipe_list(self):
+        self.assertListQueries('/api/recipes/', cold=6, warm=3)
+
+    def test_user_list(self):
+        self.assertListQueries('/api/users/', cold=3, warm=2)
+
+    def test_subscription_list(self):
+        self.assertListQueries('/api/users/subscriptions/', cold=4, warm=3)
@@ -0,0 +1,93 @@
+from recipes.models import ShoppingListItem
+from recipes.shopping_list import (get_shopping_list_cache_key,
+                                   rebuild_shopping_lists)
+from recipes.tests.base import RecipeAPITestCase
+
+
+class ShoppingListTests(RecipeAPITestCase):
+
+    def get_items(self, user):
+        return {
+            (item.ingredient_id, item.measurement_unit_id):
+                round(item.amount, 6)
+            for item in ShoppingListItem.objects.filter(user=user)
+        }
+
+    def assertMatchesRebuild(self, user):
+        items = self.get_items(user)
+        rebuild_shopping_lists([user.id])
+        self.assertEqual(items, self.get_items(user))
+
+    def add_to_cart(self, recipe):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.reader_client.post(
+                f'/api/recipes/{recipe.id}/shopping_cart/'
+            )
+        self.assertEqual(response.status_code, 201, response.content)
+
+    def remove_from_cart(self, recipe):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.reader_client.delete(
+                f'/api/recipes/{recipe.id}/shopping_cart/'
+            )
+        self.assertEqual(response.status_code, 204, response.content)
+
+    def edit_recipe(self, recipe, amounts):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.author_client.patch(
+                f'/api/recipes/{recipe.id}/',
+                self.recipe_data(amounts=amounts), format='json'
+            )
+        self.assertEqual(response.status_code, 200, response.content)
+
+    def test_cart_deltas_match_rebuild(self):
+        first = self.create_recipe(amounts={0: 100, 1: 2})
+        second = self.create_recipe(amounts={1: 3, 2: 50})
+        self.add_to_cart(first)
+        self.add_to_cart(second)
+        self.assertEqual(
+            self.get_items(self.reader)[
+                (self.ingredients[1].id, self.unit.id)
+            ], 5
+        )
+        self.assertMatchesRebuild(self.reader)
+        self.remove_from_cart(first)
+        self.assertMatchesRebuild(self.reader)
+        self.remove_from_cart(second)
+        self.assertEqual(self.get_items(self.reader), {})
+
+    def test_recipe_edit_rebuilds_lists_in_worker(self):
+        recipe = self.create_recipe(amounts={0: 100, 1: 2})
+        self.add_to_cart(recipe)
+        self.edit_recipe(recipe, {0: 150, 3: 1})
+        self.run_tasks()
+        self.assertEqual(self.get_items(self.reader), {
+            (self.ingredients[0].id, self.unit.id): 150,
+            (self.ingredients[3].id, self.unit.id): 1,
+        })
+
+    def test_cart_change_before_worker_runs(self):
+        recipe = self.create_recipe(amounts={0: 100})
+        other = self.create_recipe(amounts={0: 10})
+        self.add_to_cart(recipe)
+        self.add_to_cart(other)
+        self.edit_recipe(recipe, {0: 200})
+        self.remove_from_cart(recipe)
+        self.run_tasks()
+        self.assertEqual(self.get_items(self.reader), {
+            (self.ingredients[0].id, self.unit.id): 10,
+        })
+
+    def test_cached_list_is_invalidated_on_commit(self):
+        self.add_to_cart(self.create_recipe())
+        key = get_shopping_list_cache_key(self.reader.id, 'txt')
+        with self.captureOnCommitCallbacks() as callbacks:
+            rebuild_shopping_lists([self.reader.id])
+            self.assertEqual(
+                get_shopping_list_cache_key(self.reader.id, 'txt'), key
+            )
+        for callback in callbacks:
+            callback()
+        self.assertNotEqual(
+            get_shopping_list_cache_key(self.reader.id, 'txt'), key
+        )
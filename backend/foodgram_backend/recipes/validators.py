@@ -1,8 +1,10 @@
 from django.core.exceptions import BadRequest, ValidationError
 from django.core.validators import RegexValidator
 from django.utils.translation import gettext_lazy as _
-from foodgram_backend.settings import (MAX_COOKING_TIME,
+from foodgram_backend.settings import (IMAGE_MAX_DIMENSION, IMAGE_MAX_PIXELS,
+                                       IMAGE_MAX_UPLOAD_SIZE, MAX_COOKING_TIME,
                                        MAX_INGREDIENTS_AMOUNT, MAX_PORTIONS)
+from PIL import Image
 
 
 class ColorValidator(RegexValidator):
@@ -43,3 +45,30 @@ def validate_ingredients_data(request):
     ingredients = request.data.get('ingredients', [])
     if not ingredients:
         raise BadRequest("Ingredients list cannot be empty.")
+
+
+def validate_image_size(size):
+    if size > IMAGE_MAX_UPLOAD_SIZE:
+        raise ValidationError(
+            f"Image size must not exceed {IMAGE_MAX_UPLOAD_SIZE} bytes."
+        )
+
+
+def validate_image_dimensions(file):
+    """
+    Check the pixel size read from the image header,
+    before the image is decoded.
+    """
+    try:
+        with Image.open(file) as image:
+            width, height = image.size
+    except (OSError, ValueError, Image.DecompressionBombError):
+        raise ValidationError("Upload a valid image.")
+    finally:
+        file.seek(0)
+    if (max(width, height) > IMAGE_MAX_DIMENSION
+            or width * height > IMAGE_MAX_PIXELS):
+        raise ValidationError(
+            f"Image must be at most {IMAGE_MAX_DIMENSION} pixels wide "
+            f"and high and have at most {IMAGE_MAX_PIXELS} pixels."
+        )
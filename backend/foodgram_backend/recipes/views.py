@@ -1,25 +1,35 @@
-import csv
 import logging
 from logging.handlers import RotatingFileHandler
 
-from django.db.models import Sum
-from django.http import HttpResponse
+from django.core.cache import cache
+from django.db.models import Exists, OuterRef
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils.decorators import method_decorator
 from django_filters.rest_framework import DjangoFilterBackend
 from foodgram_backend.settings import (LOGS_BACKUP_COUNT, LOGS_MAX_BYTES,
                                        LOGS_ROOT)
-from foodgram_backend.translat_dict import get_name as _
 from rest_framework import status, viewsets
 from rest_framework.decorators import action
-from rest_framework.pagination import LimitOffsetPagination
 from rest_framework.response import Response
 from users.permissions import RecipeActionsPermission
 
+from recipes.conditional import (COUNTERS_VERSION, INGREDIENTS_VERSION,
+                                 RECIPES_VERSION, TAGS_VERSION,
+                                 conditional_index, conditional_list,
+                                 conditional_recipe)
+from recipes.counters import annotate_favorites_count
 from recipes.filters import IngredientFilterSet, RecipeFilterSet
 from recipes.models import (Favorites, Ingredient, MeasurementUnit, Recipe,
-                            RecipeIngredient, RecipeTag, ShoppingCart, Tag)
+                            ShoppingCart, Tag)
+from recipes.pagination import PageLimitPagination, RecipeCursorPagination
+from recipes.parsers import LimitedJSONParser, RecipeMultiPartParser
+from recipes.search import ingredient_index
 from recipes.serializers import (IngredientSerializer, LimitedRecipeSerializer,
                                  MeasurementUnitSerializer, RecipeSerializer,
                                  TagSerializer)
+from recipes.shopping_list import (SHOPPING_LIST_RENDERERS, cache_stream,
+                                   get_shopping_list,
+                                   get_shopping_list_cache_key)
 from recipes.validators import validate_ingredients_data, validate_tags_data
 
 logger = logging.getLogger(__name__)
@@ -32,6 +42,8 @@ handler.setFormatter(formatter)
 logger.addHandler(handler)
 
 
+@method_decorator(conditional_list(TAGS_VERSION), name='list')
+@method_decorator(conditional_list(TAGS_VERSION), name='retrieve')
 class TagViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
@@ -43,21 +55,71 @@ class MeasurementUnitViewSet(viewsets.ReadOnlyModelViewSet):
     serializer_class = MeasurementUnitSerializer
 
 
+@method_decorator(conditional_index(ingredient_index), name='list')
+@method_decorator(conditional_list(INGREDIENTS_VERSION), name='retrieve')
 class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
-    queryset = Ingredient.objects.all()
+    queryset = Ingredient.objects.select_related('measurement_unit')
     serializer_class = IngredientSerializer
     pagination_class = None
     filter_backends = (DjangoFilterBackend, )
     filterset_class = IngredientFilterSet
 
-
+    def list(self, request, *args, **kwargs):
+        """
+        Autocomplete is answered from the in-memory ingredient index.
+        """
+        name = request.query_params.get('name')
+        if name and request.query_params.get('fuzzy') in ('1', 'true'):
+            return Response(ingredient_index.fuzzy_search(name))
+        if name:
+            return Response(ingredient_index.search(name))
+        return Response(ingredient_index.all())
+
+
+@method_decorator(
+    conditional_list(
+        RECIPES_VERSION, TAGS_VERSION, INGREDIENTS_VERSION, COUNTERS_VERSION
+    ),
+    name='list'
+)
+@method_decorator(
+    conditional_recipe(TAGS_VERSION, INGREDIENTS_VERSION, COUNTERS_VERSION),
+    name='retrieve'
+)
 class RecipeViewSet(viewsets.ModelViewSet):
-    queryset = Recipe.objects.all()
+    queryset = Recipe.objects.select_related('author')
     serializer_class = RecipeSerializer
-    pagination_class = LimitOffsetPagination
+    pagination_class = PageLimitPagination
     filter_backends = [DjangoFilterBackend]
     filterset_class = RecipeFilterSet
     permission_classes = [RecipeActionsPermission]
+    parser_classes = [LimitedJSONParser, RecipeMultiPartParser]
+
+    def get_queryset(self):
+        """
+        Annotate recipes with the current user's favorite and shopping cart
+        flags, so a whole page is resolved in the same query.
+        """
+        queryset = annotate_favorites_count(super().get_queryset())
+        user = self.request.user
+        if user.is_authenticated:
+            queryset = queryset.annotate(
+                is_favorited=Exists(Favorites.objects.filter(
+                    user=user, recipe=OuterRef('pk'))),
+                is_in_shopping_cart=Exists(ShoppingCart.objects.filter(
+                    user=user, recipe=OuterRef('pk'))),
+            )
+        return queryset
+
+    def paginate_queryset(self, queryset):
+        """
+        Switch to keyset pagination when the client passes a 'cursor'
+        parameter (empty for the first page).
+        """
+        cursor_param = RecipeCursorPagination.cursor_query_param
+        if cursor_param in self.request.query_params:
+            self._paginator = RecipeCursorPagination()
+        return super().paginate_queryset(queryset)
 
     def create(self, request, *args, **kwargs):
         serializer = self.serializer_class(data=request.data)
@@ -69,18 +131,20 @@ class RecipeViewSet(viewsets.ModelViewSet):
             )
             return Response(serializer.data,
                             status=status.HTTP_201_CREATED)
+        return Response(serializer.errors,
+                        status=status.HTTP_400_BAD_REQUEST)
 
     def update(self, request, *args, **kwargs):
         validate_ingredients_data(request)
         validate_tags_data(request)
         instance = self.get_object()
-        RecipeIngredient.objects.filter(recipe=instance).delete()
-        RecipeTag.objects.filter(recipe=instance).delete()
         serializer = self.get_serializer(
             instance, data=request.data, partial=True
         )
         if serializer.is_valid(raise_exception=True):
             serializer.save()
+            # Drop the prefetched relations, they were changed by save().
+            instance._prefetched_objects_cache = {}
             return Response(serializer.data)
 
     def mark_recipe_post(self, model):
@@ -155,35 +219,34 @@ class RecipeViewSet(viewsets.ModelViewSet):
 
     @action(detail=False,
             methods=['get'],
-            url_path='download_shopping_cart')
+            url_path='download_shopping_cart',
+            renderer_classes=SHOPPING_LIST_RENDERERS)
     def download_shopping_cart(self, request, pk=None):
         """
-        Endpoint for downloading the shopping cart as a CSV file.
+        Endpoint for downloading the shopping cart.
+        The 'format' parameter selects csv (default), txt or pdf;
+        the file is streamed while the rows are read from the database
+        and cached until the user's shopping list changes.
         """
-        response = HttpResponse(content_type='text/csv')
-        response['Content-Disposition'] = 'attachment; filename="data.csv"'
-
-        user = self.request.user
-        recipes_in_shopping_cart = ShoppingCart.objects.filter(
-            user=user).values('recipe')
-        ingredients = RecipeIngredient.objects.filter(
-            recipe__in=recipes_in_shopping_cart)
-        shopping_cart = (
-            ingredients
-            .values('ingredient__name', 'measurement_unit__name')
-            .annotate(
-                total_amount=Sum('amount'),
-            )
+        renderer = request.accepted_renderer
+        content_type = renderer.media_type
+        if renderer.charset:
+            content_type = f'{content_type}; charset={renderer.charset}'
+        cache_key = get_shopping_list_cache_key(
+            request.user.id, renderer.format
         )
-        writer = csv.writer(response)
-        title_row = (_('Ingredient'), _('Amount'), _('Measurement Unit'))
-        writer.writerow(title_row)
-        for record in shopping_cart:
-            record_tuple = (
-                record.get('ingredient__name'),
-                record.get('total_amount'),
-                record.get('measurement_unit__name'),
+        content = cache.get(cache_key)
+        if content is not None:
+            response = HttpResponse(content, content_type=content_type)
+        else:
+            response = StreamingHttpResponse(
+                cache_stream(
+                    renderer.stream(get_shopping_list(request.user)),
+                    cache_key
+                ),
+                content_type=content_type
             )
-            writer.writerow(record_tuple)
-
+        response['Content-Disposition'] = (
+            f'attachment; filename="data.{renderer.format}"'
+        )
         return response
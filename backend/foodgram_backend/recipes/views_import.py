@@ -3,41 +3,65 @@ from rest_framework.response import Response
 from rest_framework.views import APIView
 from users.permissions import IsAdminOrReadOnly
 
-from recipes.models import Ingredient, MeasurementUnit
+from recipes.ingredient_import import IngredientImporter, read_rows
 from recipes.serializers import IngredientSerializer
 
 
 class ImportIngredientsView(APIView):
+    """
+    Import ingredients from the 'data' list of the request body
+    or from an uploaded CSV or JSON 'file', read row by row.
+    The response lists the ids of the imported 'data' items;
+    a file may be too large for that. A file found invalid after
+    some chunks have been imported reports them with a 'file_error'.
+    """
     serializer_class = IngredientSerializer(many=True)
     permission_classes = (IsAdminOrReadOnly, )
 
     def post(self, request, *args, **kwargs):
-        data = request.data.get('data')
-        serializer = IngredientSerializer(data=data, many=True)
-        new_ids = []
-
-        if serializer.is_valid():
-            for item in serializer.validated_data:
-                measurement_unit_name = item.get('measurement_unit')
-                ingredient_name = item.get('name')
-                measurement_unit, st = MeasurementUnit.objects.get_or_create(
-                    name=measurement_unit_name)
-
-                Ingredient.objects.get_or_create(
-                    name=ingredient_name,
-                    measurement_unit=measurement_unit
+        upload = request.FILES.get('file')
+        if upload is not None:
+            rows = read_rows(upload.file, upload.name)
+        else:
+            data = request.data.get('data')
+            if not isinstance(data, list):
+                return Response(
+                    {'detail': f'Invalid data. Data: {data}'},
+                    status=status.HTTP_400_BAD_REQUEST
                 )
-                new_ids.append(Ingredient.objects.get(name=ingredient_name).id)
+            rows = enumerate(data, 1)
 
-            return Response(
-                {'detail':
-                    f'Ingredients imported successfully: {new_ids}'},
-                status=status.HTTP_201_CREATED)
+        importer = IngredientImporter(collect_ids=upload is None)
+        detail = 'Ingredients imported successfully.'
+        file_error = None
+        try:
+            importer.run(rows)
+        except (ValueError, UnicodeDecodeError) as error:
+            if not importer.processed:
+                return Response(
+                    {'detail': f'Invalid file: {error}'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            # The chunks read before the error are already committed.
+            file_error = (
+                f'Invalid file after row {importer.processed}: {error}'
+            )
+            detail = 'Ingredients imported partially.'
 
-        return Response(
-            {
-                'detail': f'Invalid data. Data: {data}',
-                'errors': serializer.errors
-            },
-            status=status.HTTP_400_BAD_REQUEST
-        )
+        result = {
+            'detail': detail,
+            'created': importer.created,
+            'existing': importer.existing,
+            'errors': [
+                {'row': line, 'error': error}
+                for line, error in importer.errors
+            ],
+        }
+        if file_error is not None:
+            result['file_error'] = file_error
+        elif upload is None:
+            result['detail'] = (
+                f'Ingredients imported successfully: {importer.ids}'
+            )
+            result['ids'] = importer.ids
+        return Response(result, status=status.HTTP_201_CREATED)
@@ -0,0 +1,16 @@
+from django.contrib import admin
+
+from tasks.models import Task
+
+
+class TaskAdmin(admin.ModelAdmin):
+    list_display = (
+        'id', 'name', 'status', 'run_at', 'attempts', 'worker', 'finished_at'
+    )
+    list_filter = ('status', 'name')
+    search_fields = ('name', 'key')
+    readonly_fields = ('attempts', 'worker', 'locked_at', 'created_at',
+                       'finished_at', 'last_error')
+
+
+admin.site.register(Task, TaskAdmin)
@@ -0,0 +1,13 @@
+from django.apps import AppConfig
+from django.utils.module_loading import autodiscover_modules
+from foodgram_backend.translat_dict import get_name as _
+
+
+class TasksConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'tasks'
+    verbose_name = _('Tasks')
+
+    def ready(self):
+        # Register the tasks declared in the tasks modules of the apps.
+        autodiscover_modules('tasks')
@@ -0,0 +1,43 @@
+import signal
+
+from django.core.management.base import BaseCommand
+from foodgram_backend.settings import TASKS_CONCURRENCY, TASKS_POLL_INTERVAL
+
+from tasks.worker import Worker
+
+
+class Command(BaseCommand):
+    help = 'Run the queued background tasks until stopped.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--concurrency', type=int, default=TASKS_CONCURRENCY,
+            help='Number of tasks run at the same time.'
+        )
+        parser.add_argument(
+            '--poll-interval', type=float, default=TASKS_POLL_INTERVAL,
+            help='Seconds to wait when no task is due.'
+        )
+        parser.add_argument(
+            '--burst', action='store_true',
+            help='Stop once no task is due.'
+        )
+
+    def handle(self, *args, **options):
+        worker = Worker(
+            concurrency=options['concurrency'],
+            poll_interval=options['poll_interval'],
+            burst=options['burst'],
+        )
+        # Running tasks are finished before the worker stops.
+        signal.signal(signal.SIGTERM, worker.stop)
+        signal.signal(signal.SIGINT, worker.stop)
+        self.stdout.write(
+            f'Worker {worker.name} started with '
+            f'{worker.concurrency} threads.'
+        )
+        worker.run()
+        self.stdout.write(self.style.SUCCESS(
+            f'Worker stopped: {worker.processed} tasks run, '
+            f'{worker.failed} failed.'
+        ))
@@ -0,0 +1,47 @@
+# Generated by Django 3.2.3 on 2026-10-18 18:15
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Task',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=200, verbose_name='название')),
+                ('args', models.JSONField(default=list, verbose_name='аргументы')),
+                ('kwargs', models.JSONField(default=dict, verbose_name='именованные аргументы')),
+                ('key', models.CharField(blank=True, max_length=200, null=True, verbose_name='ключ')),
+                ('status', models.CharField(choices=[('queued', 'в очереди'), ('running', 'выполняется'), ('done', 'выполнена'), ('failed', 'ошибка')], default='queued', max_length=10, verbose_name='статус')),
+                ('run_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='время запуска')),
+                ('attempts', models.PositiveIntegerField(default=0, verbose_name='попытки')),
+                ('max_attempts', models.PositiveIntegerField(default=5, verbose_name='максимум попыток')),
+                ('last_error', models.TextField(blank=True, verbose_name='последняя ошибка')),
+                ('worker', models.CharField(blank=True, max_length=200, verbose_name='обработчик')),
+                ('locked_at', models.DateTimeField(blank=True, null=True, verbose_name='время захвата')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='время создания')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='время завершения')),
+            ],
+            options={
+                'verbose_name': 'задача',
+                'verbose_name_plural': 'Задачи',
+                'ordering': ('-run_at', '-id'),
+            },
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['status', 'run_at'], name='task_status_run_at_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='task',
+            constraint=models.UniqueConstraint(condition=models.Q(('status__in', ('queued', 'running'))), fields=('key',), name='unique_active_task_key'),
+        ),
+    ]
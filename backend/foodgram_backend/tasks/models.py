@@ -0,0 +1,81 @@
+from django.db import models
+from django.utils import timezone
+from foodgram_backend.settings import (DISPLAY_TEXT_MAX_LENGTH,
+                                       NAME_MAX_LENGTH, TASKS_MAX_ATTEMPTS)
+from foodgram_backend.translat_dict import get_name as _
+
+
+class Task(models.Model):
+    """
+    A call of a registered task function, run by the run_worker command.
+    """
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUSES = (
+        (QUEUED, _('queued')),
+        (RUNNING, _('running')),
+        (DONE, _('done')),
+        (FAILED, _('failed')),
+    )
+    ACTIVE_STATUSES = (QUEUED, RUNNING)
+
+    name = models.CharField(
+        verbose_name=_('name'), max_length=NAME_MAX_LENGTH
+    )
+    args = models.JSONField(verbose_name=_('arguments'), default=list)
+    kwargs = models.JSONField(
+        verbose_name=_('keyword arguments'), default=dict
+    )
+    # Only one queued or running task may have the same key.
+    key = models.CharField(
+        verbose_name=_('key'), max_length=NAME_MAX_LENGTH,
+        null=True, blank=True
+    )
+    status = models.CharField(
+        verbose_name=_('status'), max_length=10,
+        choices=STATUSES, default=QUEUED
+    )
+    run_at = models.DateTimeField(
+        verbose_name=_('run at'), default=timezone.now
+    )
+    attempts = models.PositiveIntegerField(
+        verbose_name=_('attempts'), default=0
+    )
+    max_attempts = models.PositiveIntegerField(
+        verbose_name=_('max attempts'), default=TASKS_MAX_ATTEMPTS
+    )
+    last_error = models.TextField(verbose_name=_('last error'), blank=True)
+    worker = models.CharField(
+        verbose_name=_('worker'), max_length=NAME_MAX_LENGTH, blank=True
+    )
+    locked_at = models.DateTimeField(
+        verbose_name=_('locked at'), null=True, blank=True
+    )
+    created_at = models.DateTimeField(
+        verbose_name=_('created at'), auto_now_add=True
+    )
+    finished_at = models.DateTimeField(
+        verbose_name=_('finished at'), null=True, blank=True
+    )
+
+    class Meta:
+        verbose_name = _('task')
+        verbose_name_plural = _('Tasks')
+        ordering = ('-run_at', '-id')
+        indexes = [
+            models.Index(
+                fields=('status', 'run_at'), name='task_status_run_at_idx'
+            ),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=('key',),
+                condition=models.Q(status__in=('queued', 'running')),
+                name='unique_active_task_key'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.name} {self.status}'[:DISPLAY_TEXT_MAX_LENGTH]
@@ -0,0 +1,188 @@
+import logging
+import traceback
+from contextlib import nullcontext
+from datetime import timedelta
+from logging.handlers import RotatingFileHandler
+
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F, Max
+from django.utils import timezone
+from foodgram_backend.settings import (LOGS_BACKUP_COUNT, LOGS_MAX_BYTES,
+                                       LOGS_ROOT, TASKS_EAGER,
+                                       TASKS_KEEP_DONE, TASKS_LOCK_TIMEOUT,
+                                       TASKS_MAX_ATTEMPTS,
+                                       TASKS_MAX_RETRY_DELAY, TASKS_PERIODIC,
+                                       TASKS_RETRY_DELAY)
+
+from tasks.models import Task
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.ERROR)
+handler = RotatingFileHandler(f"{LOGS_ROOT}{__name__}.log",
+                              maxBytes=LOGS_MAX_BYTES,
+                              backupCount=LOGS_BACKUP_COUNT)
+formatter = logging.Formatter("%(name)s %(asctime)s %(levelname)s %(message)s")
+handler.setFormatter(formatter)
+logger.addHandler(handler)
+
+PERIODIC_TASK_KEY = 'periodic:{name}'
+
+# Task name -> registered task function.
+registry = {}
+
+
+def task(max_attempts=TASKS_MAX_ATTEMPTS, name=None):
+    """
+    Register a function as a task. The function stays callable directly;
+    enqueue(function, ...) runs it in a worker. Arguments must be
+    JSON serializable.
+    """
+    def register(func):
+        func.task_name = name or f'{func.__module__}.{func.__name__}'
+        func.max_attempts = max_attempts
+        registry[func.task_name] = func
+        return func
+    return register
+
+
+def get_task_function(name):
+    try:
+        return registry[name]
+    except KeyError:
+        raise LookupError(f'Unknown task {name}.')
+
+
+def enqueue(func, *args, run_at=None, delay=None, key=None, **kwargs):
+    """
+    Queue a call of a task function or of a task name. It runs after
+    the current transaction commits, at run_at or delay seconds from now.
+    A task with the key of a queued or running task is not queued again,
+    None is returned then.
+    """
+    func = get_task_function(getattr(func, 'task_name', func))
+    if TASKS_EAGER:
+        transaction.on_commit(lambda: func(*args, **kwargs))
+        return None
+    if run_at is None:
+        run_at = timezone.now() + timedelta(seconds=delay or 0)
+    new_task = Task(
+        name=func.task_name, args=list(args), kwargs=kwargs, key=key,
+        run_at=run_at, max_attempts=func.max_attempts
+    )
+    if key is None:
+        new_task.save()
+        return new_task
+    try:
+        with transaction.atomic():
+            new_task.save()
+    except IntegrityError:
+        return None
+    return new_task
+
+
+def claim_task(worker):
+    """
+    Mark the next due task as running by the worker and return it.
+    PostgreSQL skips the rows locked by other workers. Elsewhere
+    the conditional update lets only one worker claim a task; it runs
+    outside a transaction, as SQLite cannot upgrade a read transaction
+    to a write one while another connection writes.
+    """
+    now = timezone.now()
+    queryset = Task.objects.filter(
+        status=Task.QUEUED, run_at__lte=now
+    ).order_by('run_at', 'id')
+    skip_locked = connection.features.has_select_for_update_skip_locked
+    if skip_locked:
+        queryset = queryset.select_for_update(skip_locked=True)
+    with transaction.atomic() if skip_locked else nullcontext():
+        claimed = queryset.first()
+        if claimed is None:
+            return None
+        updated = Task.objects.filter(
+            pk=claimed.pk, status=Task.QUEUED
+        ).update(
+            status=Task.RUNNING, worker=worker, locked_at=now,
+            attempts=F('attempts') + 1
+        )
+    if not updated:
+        return None
+    claimed.status = Task.RUNNING
+    claimed.worker = worker
+    claimed.locked_at = now
+    claimed.attempts += 1
+    return claimed
+
+
+def get_retry_delay(attempts):
+    return min(TASKS_RETRY_DELAY * 2 ** (attempts - 1), TASKS_MAX_RETRY_DELAY)
+
+
+def run_task(claimed):
+    """
+    Run a claimed task; a failed one is queued again with a growing
+    delay until it runs out of attempts.
+    """
+    try:
+        get_task_function(claimed.name)(*claimed.args, **claimed.kwargs)
+    except Exception:
+        logger.exception(f'Task {claimed.id} {claimed.name} failed.')
+        now = timezone.now()
+        if claimed.attempts < claimed.max_attempts:
+            fields = dict(
+                status=Task.QUEUED,
+                run_at=now + timedelta(
+                    seconds=get_retry_delay(claimed.attempts)
+                ),
+            )
+        else:
+            fields = dict(status=Task.FAILED, finished_at=now)
+        Task.objects.filter(pk=claimed.pk).update(
+            last_error=traceback.format_exc(), locked_at=None, **fields
+        )
+        return False
+    Task.objects.filter(pk=claimed.pk).update(
+        status=Task.DONE, finished_at=timezone.now(), locked_at=None
+    )
+    return True
+
+
+def requeue_stale_tasks():
+    """
+    Queue again the tasks of workers that stopped without finishing them.
+    """
+    now = timezone.now()
+    stale = Task.objects.filter(
+        status=Task.RUNNING,
+        locked_at__lt=now - timedelta(seconds=TASKS_LOCK_TIMEOUT)
+    )
+    failed = stale.filter(attempts__gte=F('max_attempts')).update(
+        status=Task.FAILED, finished_at=now, locked_at=None,
+        last_error='The worker stopped while running the task.'
+    )
+    return failed + stale.update(status=Task.QUEUED, locked_at=None)
+
+
+def schedule_periodic_tasks():
+    """
+    Queue the next run of every periodic task that is not queued yet,
+    an interval after its previous run.
+    """
+    now = timezone.now()
+    for name, interval in TASKS_PERIODIC.items():
+        key = PERIODIC_TASK_KEY.format(name=name)
+        runs = Task.objects.filter(key=key)
+        if runs.filter(status__in=Task.ACTIVE_STATUSES).exists():
+            continue
+        last_run = runs.aggregate(Max('run_at'))['run_at__max']
+        run_at = now
+        if last_run is not None:
+            run_at = max(now, last_run + timedelta(seconds=interval))
+        enqueue(name, run_at=run_at, key=key)
+
+
+def prune_finished_tasks():
+    return Task.objects.filter(
+        status=Task.DONE,
+        finished_at__lt=timezone.now() - timedelta(seconds=TASKS_KEEP_DONE)
+    ).delete()[0]
@@ -0,0 +1,6 @@
+from tasks.queue import prune_finished_tasks, task
+
+
+@task()
+def prune_tasks():
+    prune_finished_tasks()
@@ -0,0 +1,83 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.test import TestCase
+from django.utils import timezone
+from foodgram_backend.settings import TASKS_RETRY_DELAY
+
+from tasks.models import Task
+from tasks.queue import (claim_task, enqueue, requeue_stale_tasks, run_task,
+                         task)
+
+calls = []
+
+
+@task(max_attempts=2)
+def failing_task(value):
+    calls.append(value)
+    raise RuntimeError('failed')
+
+
+@task()
+def succeeding_task(value):
+    calls.append(value)
+
+
+class TaskQueueTests(TestCase):
+
+    def setUp(self):
+        calls.clear()
+
+    def make_due(self):
+        Task.objects.update(run_at=timezone.now())
+
+    def test_task_runs_once(self):
+        enqueue(succeeding_task, 1)
+        claimed = claim_task('worker')
+        self.assertIsNone(claim_task('other'))
+        self.assertTrue(run_task(claimed))
+        self.assertEqual(calls, [1])
+        self.assertEqual(Task.objects.get().status, Task.DONE)
+        self.assertIsNone(claim_task('worker'))
+
+    def test_failed_task_is_retried_with_delay(self):
+        enqueue(failing_task, 1)
+        started = timezone.now()
+        self.assertFalse(run_task(claim_task('worker')))
+        retried = Task.objects.get()
+        self.assertEqual(retried.status, Task.QUEUED)
+        self.assertEqual(retried.attempts, 1)
+        self.assertIn('RuntimeError', retried.last_error)
+        self.assertGreaterEqual(
+            retried.run_at, started + timedelta(seconds=TASKS_RETRY_DELAY)
+        )
+        # Not due until the delay has passed.
+        self.assertIsNone(claim_task('worker'))
+
+        self.make_due()
+        self.assertFalse(run_task(claim_task('worker')))
+        failed = Task.objects.get()
+        self.assertEqual(failed.status, Task.FAILED)
+        self.assertEqual(failed.attempts, 2)
+        self.assertEqual(calls, [1, 1])
+
+    def test_key_deduplicates_active_tasks(self):
+        self.assertIsNotNone(enqueue(succeeding_task, 1, key='same'))
+        self.assertIsNone(enqueue(succeeding_task, 2, key='same'))
+        run_task(claim_task('worker'))
+        self.assertIsNotNone(enqueue(succeeding_task, 3, key='same'))
+
+    def test_stale_task_is_requeued(self):
+        enqueue(succeeding_task, 1)
+        claim_task('worker')
+        Task.objects.update(locked_at=timezone.now() - timedelta(days=1))
+        self.assertEqual(requeue_stale_tasks(), 1)
+        self.assertEqual(Task.objects.get().status, Task.QUEUED)
+
+    @mock.patch('tasks.queue.TASKS_EAGER', True)
+    def test_eager_task_runs_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertIsNone(enqueue(succeeding_task, 1))
+            self.assertEqual(calls, [])
+        self.assertEqual(calls, [1])
+        self.assertFalse(Task.objects.exists())
@@ -0,0 +1,80 @@
+import os
+import socket
+import threading
+
+from django.db import DatabaseError, connection
+from foodgram_backend.settings import (TASKS_HOUSEKEEPING_INTERVAL,
+                                       TASKS_POLL_INTERVAL)
+
+from tasks.queue import (claim_task, logger, requeue_stale_tasks, run_task,
+                         schedule_periodic_tasks)
+
+
+class Worker:
+    """
+    Runs queued tasks in threads, each with its own database connection.
+    The main thread requeues stale tasks and schedules periodic ones.
+    In burst mode the worker stops once no task is due.
+    """
+
+    def __init__(self, concurrency=1, poll_interval=TASKS_POLL_INTERVAL,
+                 burst=False):
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.burst = burst
+        self.name = f'{socket.gethostname()}:{os.getpid()}'
+        self.stopping = threading.Event()
+        self.processed = 0
+        self.failed = 0
+        self.lock = threading.Lock()
+
+    def stop(self, *args):
+        self.stopping.set()
+
+    def run(self):
+        self.housekeeping()
+        threads = [
+            threading.Thread(
+                target=self.work, args=(f'{self.name}:{number}',),
+                daemon=True
+            )
+            for number in range(self.concurrency)
+        ]
+        for thread in threads:
+            thread.start()
+        while not self.burst and not self.stopping.wait(
+            TASKS_HOUSEKEEPING_INTERVAL
+        ):
+            self.housekeeping()
+        for thread in threads:
+            thread.join()
+        connection.close()
+
+    def housekeeping(self):
+        try:
+            requeue_stale_tasks()
+            if not self.burst:
+                schedule_periodic_tasks()
+        except DatabaseError:
+            logger.exception('Task housekeeping failed.')
+
+    def work(self, name):
+        try:
+            while not self.stopping.is_set():
+                try:
+                    claimed = claim_task(name)
+                except DatabaseError:
+                    logger.exception('Claiming a task failed.')
+                    self.stopping.wait(self.poll_interval)
+                    continue
+                if claimed is None:
+                    if self.burst:
+                        break
+                    self.stopping.wait(self.poll_interval)
+                    continue
+                succeeded = run_task(claimed)
+                with self.lock:
+                    self.processed += 1
+                    self.failed += not succeeded
+        finally:
+            connection.close()
@@ -4,7 +4,27 @@ from foodgram_backend.settings import EMAIL_MAX_LENGTH, USERNAME_MAX_LENTH
 from foodgram_backend.translat_dict import get_name as _
 
 
-class User(AbstractUser):
+class CounterFieldsMixin:
+    """
+    Counter columns, and other columns derived in the database,
+    are changed only with queryset updates, so saving a loaded object
+    must not write stale values back.
+    """
+    counter_fields = ()
+
+    def save(self, *args, **kwargs):
+        if (not self._state.adding and not args
+                and kwargs.get('update_fields') is None
+                and not kwargs.get('force_insert')):
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.counter_fields
+            ]
+        super().save(*args, **kwargs)
+
+
+class User(CounterFieldsMixin, AbstractUser):
     groups = models.ManyToManyField(
         'auth.Group',
         related_name='user_groups',
@@ -38,6 +58,16 @@ class User(AbstractUser):
     )
     first_name = models.CharField(max_length=USERNAME_MAX_LENTH)
     last_name = models.CharField(max_length=USERNAME_MAX_LENTH)
+    recipes_count = models.PositiveIntegerField(
+        verbose_name=_('recipes count'),
+        default=0, editable=False,
+    )
+    followers_count = models.PositiveIntegerField(
+        verbose_name=_('followers count'),
+        default=0, editable=False,
+    )
+
+    counter_fields = ('recipes_count', 'followers_count')
 
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ('username', 'password', 'first_name', 'last_name')
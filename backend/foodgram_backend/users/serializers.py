@@ -1,10 +1,25 @@
 from foodgram_backend.settings import EMAIL_MAX_LENGTH, USERNAME_MAX_LENTH
+from recipes.instrumentation import MeasuredSerializerMixin
 from rest_framework import serializers
 
-from users.models import User
+from users.models import Subscription, User
 
 
-class UserCreateSerializer(serializers.ModelSerializer):
+def get_followed_ids(request):
+    """
+    Ids of the authors the current user follows,
+    loaded once per request and shared by every serializer.
+    """
+    if not hasattr(request, 'followed_ids'):
+        request.followed_ids = set(
+            Subscription.objects.filter(follower=request.user).values_list(
+                'following_id', flat=True)
+        )
+    return request.followed_ids
+
+
+class UserCreateSerializer(MeasuredSerializerMixin,
+                           serializers.ModelSerializer):
     username = serializers.RegexField(
         regex=r'^[\w.@+-]+$',
         max_length=USERNAME_MAX_LENTH,
@@ -38,19 +53,19 @@ class UserCreateSerializer(serializers.ModelSerializer):
         return user
 
 
-class UserGETSerializer(serializers.ModelSerializer):
+class UserGETSerializer(MeasuredSerializerMixin, serializers.ModelSerializer):
     is_subscribed = serializers.SerializerMethodField()
 
     def get_is_subscribed(self, obj):
         request = self.context.get('request')
         if request and request.user.is_authenticated:
-            return obj.followers_set.filter(follower=request.user).exists()
+            return obj.id in get_followed_ids(request)
         return False
 
     class Meta:
         model = User
         fields = ('id', 'username', 'first_name', 'last_name',
-                  'email', 'is_subscribed')
+                  'email', 'is_subscribed', 'followers_count')
 
 
 class TokenLoginSerializer(serializers.Serializer):
@@ -2,11 +2,11 @@ import logging
 from venv import logger
 
 from django.db import IntegrityError
+from recipes.pagination import PageLimitPagination
 from recipes.serializers import UserRecipesSerializer
 from rest_framework import mixins, status, viewsets
 from rest_framework.authtoken.models import Token
 from rest_framework.decorators import action
-from rest_framework.pagination import LimitOffsetPagination
 from rest_framework.response import Response
 
 from users.models import Subscription, User
@@ -22,7 +22,7 @@ class UserViewSet(viewsets.ModelViewSet):
     queryset = User.objects.all()
     serializer_class = UserGETSerializer
     permission_classes = [UsersAuthPermission]
-    pagination_class = LimitOffsetPagination
+    pagination_class = PageLimitPagination
 
     def create(self, request, *args, **kwargs):
         self.serializer_class = UserCreateSerializer
@@ -129,7 +129,9 @@ class UserViewSet(viewsets.ModelViewSet):
             return Response(
                 UserRecipesSerializer(
                     following_user,
-                    context={'recipes_limit': recipes_limit}
+                    context={
+                        'request': request, 'recipes_limit': recipes_limit
+                    }
                 ).data,
                 status=status.HTTP_204_NO_CONTENT
             )
@@ -147,7 +149,9 @@ class UserViewSet(viewsets.ModelViewSet):
             return Response(
                 UserRecipesSerializer(
                     following_user,
-                    context={'recipes_limit': recipes_limit}
+                    context={
+                        'request': request, 'recipes_limit': recipes_limit
+                    }
                 ).data,
                 status=response_status
             )
@@ -156,7 +160,7 @@ class UserViewSet(viewsets.ModelViewSet):
 class SubscriptionViewSet(mixins.ListModelMixin, viewsets.GenericViewSet):
     serializer_class = UserRecipesSerializer
     permission_classes = [UsersAuthPermission]
-    pagination_class = LimitOffsetPagination
+    pagination_class = PageLimitPagination
 
     def get_queryset(self):
         return self.request.user.subscriptions.all()
@@ -168,11 +172,13 @@ class SubscriptionViewSet(mixins.ListModelMixin, viewsets.GenericViewSet):
 
         if page is not None:
             serializer = UserRecipesSerializer(
-                page, context={'recipes_limit': recipes_limit}, many=True
+                page, many=True,
+                context={'request': request, 'recipes_limit': recipes_limit}
             )
             return self.get_paginated_response(serializer.data)
 
         serializer = UserRecipesSerializer(
-            queryset, context={'recipes_limit': recipes_limit}, many=True
+            queryset, many=True,
+            context={'request': request, 'recipes_limit': recipes_limit}
         )
         return Response(serializer.data)